@@ -0,0 +1,120 @@
+"""Maintenance commands: python -m app.cli <command>"""
+import argparse
+import asyncio
+import sys
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import async_session, async_write_session, engine, write_engine, init_db
+from app.models.models import User
+from app.services.db_migration import TargetNotEmptyError, copy_database, sqlite_source_url
+from app.services.rollups import rebuild_rollups, verify_rollups
+from app.services.statement_import import StatementFormatError, import_statement, read_statement
+
+DEFAULT_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+async def rollups_rebuild(args) -> int:
+    async with async_write_session() as session:
+        rows = await rebuild_rollups(session)
+        await session.commit()
+    print(f"Rebuilt {rows} rollup rows")
+    return 0
+
+
+async def rollups_verify(args) -> int:
+    async with async_session() as session:
+        mismatches = await verify_rollups(session)
+    for m in mismatches:
+        print(
+            f"{m['table']} {m['period']} user={m['user_id']} category={m['category_id']}: "
+            f"expected {m['expected']}, stored {m['stored']}"
+        )
+    print(f"{len(mismatches)} mismatched rollup rows")
+    return 1 if mismatches else 0
+
+
+async def migrate_sqlite(args) -> int:
+    """Copy an existing SQLite database into the configured DATABASE_URL."""
+    source = create_async_engine(sqlite_source_url(args.source))
+    try:
+        copied = await copy_database(source, write_engine, chunk_size=args.chunk_size)
+    except TargetNotEmptyError as e:
+        print(f"{e}; migrate into an empty database")
+        return 1
+    finally:
+        await source.dispose()
+    for table, rows in copied.items():
+        print(f"{table}: {rows} rows")
+    print(f"Copied {sum(copied.values())} rows")
+    return 0
+
+
+async def import_statement_file(args) -> int:
+    async with async_session() as session:
+        user = await session.get(User, UUID(args.user_id))
+    if user is None:
+        print(f"No user {args.user_id}")
+        return 1
+    
+    with open(args.path, encoding="utf-8-sig", errors="replace", newline="") as text:
+        try:
+            result = await import_statement(
+                read_statement(text, args.path, args.format),
+                user.id,
+                user.household_id,
+                use_claude=not args.no_claude,
+            )
+        except StatementFormatError as e:
+            print(f"Could not read statement: {e}")
+            return 1
+    
+    print(
+        f"Imported {result.imported}, {result.duplicates} duplicates, "
+        f"{result.skipped} skipped, {result.claude_calls} Claude calls"
+    )
+    for method, rows in sorted(result.categorized.items()):
+        print(f"  {method}: {rows}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    parser.set_defaults(init_db=True)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    rollups = commands.add_parser("rollups", help="Monthly and daily spending rollups")
+    rollups_commands = rollups.add_subparsers(dest="action", required=True)
+    rollups_commands.add_parser("rebuild", help="Recompute rollups from receipts").set_defaults(run=rollups_rebuild)
+    rollups_commands.add_parser("verify", help="Check rollups against receipts").set_defaults(run=rollups_verify)
+    
+    statement = commands.add_parser("import-statement", help="Import a CSV or OFX/QFX card statement")
+    statement.add_argument("path")
+    statement.add_argument("--format", choices=["csv", "ofx"], help="Default: guess from the file")
+    statement.add_argument("--user-id", default=DEFAULT_USER_ID)
+    statement.add_argument("--no-claude", action="store_true", help="Leave unknown merchants as Other")
+    statement.set_defaults(run=import_statement_file)
+    
+    migrate = commands.add_parser("migrate-sqlite", help="Copy a SQLite database into DATABASE_URL")
+    migrate.add_argument("source", help="SQLite file path or sqlite+aiosqlite:// URL")
+    migrate.add_argument("--chunk-size", type=int, default=1000)
+    # The target must start empty, so don't seed it first
+    migrate.set_defaults(run=migrate_sqlite, init_db=False)
+    
+    return parser
+
+
+async def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.init_db:
+            await init_db()
+        return await args.run(args)
+    finally:
+        await engine.dispose()
+        await write_engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,17 +8,66 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite+aiosqlite:///./budget_tracker.db"
+    # "production" turns off SQL echo and enables the SQLite tuning below
+    database_profile: Literal["development", "production"] = "development"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    # PostgreSQL (postgresql+asyncpg://...) connection pool
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    db_statement_cache_size: int = 100  # Per connection; set 0 behind pgbouncer
     
     # Claude API
     anthropic_api_key: str
     claude_model: str = "claude-sonnet-4-20250514"
+    claude_max_concurrency: int = 4  # Max in-flight Claude requests per process
+    claude_categorize_batch_size: int = 25  # Merchants per batched categorization prompt
+    claude_timeout_seconds: float = 60.0
+    claude_requests_per_minute: int = 50  # Client-side rate limit; 0 disables it
+    claude_burst: int = 10  # Requests that can go at once after an idle spell
+    claude_max_retries: int = 3  # For 429, 5xx/529 and timeouts
+    claude_retry_base_seconds: float = 1.0  # Backoff doubles from here, with jitter
+    claude_retry_max_seconds: float = 30.0  # Longer Retry-Afters fail over to the job queue
+    claude_breaker_threshold: int = 5  # Consecutive failures that open the circuit breaker
+    claude_breaker_reset_seconds: float = 30.0  # Open time before a trial request
     
     # Storage
     upload_dir: Path = Path("uploads")
     max_upload_size_mb: int = 10
+    batch_upload_max_files: int = 50
+    batch_upload_concurrency: int = 4
+    statement_import_chunk_size: int = 5000  # Rows parsed, categorized and inserted per batch
+    export_batch_size: int = 1000  # Rows fetched per round-trip while streaming exports
+    # Searches with at least this many hits skip ranking (it scores every hit)
+    search_rank_max_matches: int = 1000
+    
+    # Image preprocessing before vision extraction
+    image_normalization_enabled: bool = True
+    image_max_dimension: int = 1568  # Longest side in pixels
+    image_grayscale: bool = True
+    image_jpeg_quality: int = 80
+    image_processing_workers: int = 2
+    
+    # Extraction cache (keyed by image SHA-256)
+    extraction_cache_enabled: bool = True
+    extraction_cache_max_entries: int = 5000
+    extraction_cache_max_age_days: int = 90
+    
+    # Budget dashboard response cache
+    dashboard_cache_max_entries: int = 256
+    
+    # Background processing
+    receipt_worker_count: int = 2
+    receipt_job_max_attempts: int = 3
+    receipt_job_poll_seconds: float = 5.0
     
     # Categorization
     category_confidence_threshold: float = 0.7  # Below this, flag for review
+    # "combined" asks the vision call for a category too, saving a round-trip
+    extraction_mode: Literal["separate", "combined"] = "separate"
     
     class Config:
         env_file = ".env"
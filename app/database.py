@@ -1,27 +1,227 @@
 from uuid import UUID
+import sqlalchemy as sa
 from sqlmodel import SQLModel, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+def normalize_database_url(url: str) -> str:
+    """Point plain postgres:// URLs (as most hosts hand them out) at asyncpg."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+database_url = normalize_database_url(settings.database_url)
+is_sqlite = database_url.startswith("sqlite")
+is_postgres = database_url.startswith("postgresql")
+is_production = settings.database_profile == "production"
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning for the production profile."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}")
+    cursor.close()
+
+def engine_options() -> dict:
+    """Backend-specific create_async_engine arguments."""
+    if not is_postgres:
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "connect_args": {"prepared_statement_cache_size": settings.db_statement_cache_size},
+    }
+
+engine = create_async_engine(
+    database_url,
+    echo=settings.debug and not is_production,
+    **engine_options(),
+)
+
+# SQLite allows one writer at a time. In production all writes go through a
+# single pooled connection, so they queue in-process instead of failing with
+# "database is locked"; reads use the regular pool and, with WAL, never wait.
+if is_sqlite and is_production:
+    write_engine = create_async_engine(
+        database_url,
+        echo=False,
+        pool_size=1,
+        max_overflow=0,
+    )
+    sa.event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    sa.event.listen(write_engine.sync_engine, "connect", _set_sqlite_pragmas)
+else:
+    write_engine = engine
 
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+async_write_session = sessionmaker(
+    write_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
 
-async def init_db():
-    from app.models.models import Household, User, Category, DEFAULT_CATEGORIES
+async def get_write_session() -> AsyncSession:
+    """Session for requests that write. Keep these short: no API calls inside."""
+    async with async_write_session() as session:
+        yield session
+
+def _add_missing_columns(conn):
+    """Bring tables created by older versions up to the current models.
     
-    async with engine.begin() as conn:
+    create_all only creates missing tables, so new columns (and indexes on
+    them) are added here. New columns must be nullable.
+    """
+    inspector = sa.inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(sa.text(
+                f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            ))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def backfill_derived_columns(conn):
+    """Populate derived columns for rows written before they existed."""
+    conn.execute(sa.text(
+        'UPDATE receipt SET household_id = '
+        '(SELECT "user".household_id FROM "user" WHERE "user".id = receipt.user_id) '
+        "WHERE household_id IS NULL"
+    ))
+    conn.execute(sa.text(
+        "UPDATE receipt SET effective_date = COALESCE(transaction_date, created_at) "
+        "WHERE effective_date IS NULL"
+    ))
+
+# Full-text index over receipts for GET /receipts/search (SQLite only). Rows
+# share the receipt's rowid; triggers keep them in step with receipt and
+# lineitem. FTS5 flushes its pending index at every savepoint, which each
+# trigger firing opens, so statement imports skip the insert trigger and
+# index a whole chunk at once (receipt_queries.receipt_fts_insert).
+_SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE receipt_fts USING fts5(
+        merchant_name, payment_method, items,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER receipt_fts_insert AFTER INSERT ON receipt
+    WHEN new.import_hash IS NULL BEGIN
+        INSERT INTO receipt_fts (rowid, merchant_name, payment_method, items)
+        VALUES (new.rowid, new.merchant_name, new.payment_method, '');
+    END
+    """,
+    """
+    CREATE TRIGGER receipt_fts_update AFTER UPDATE OF merchant_name, payment_method ON receipt BEGIN
+        UPDATE receipt_fts
+        SET merchant_name = new.merchant_name, payment_method = new.payment_method
+        WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER receipt_fts_delete AFTER DELETE ON receipt BEGIN
+        DELETE FROM receipt_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER lineitem_fts_insert AFTER INSERT ON lineitem BEGIN
+        UPDATE receipt_fts SET items = ltrim(items || ' ' || new.description)
+        WHERE rowid = (SELECT rowid FROM receipt WHERE id = new.receipt_id);
+    END
+    """,
+    """
+    CREATE TRIGGER lineitem_fts_delete AFTER DELETE ON lineitem BEGIN
+        UPDATE receipt_fts
+        SET items = coalesce(
+            (SELECT group_concat(description, ' ') FROM lineitem WHERE receipt_id = old.receipt_id), ''
+        )
+        WHERE rowid = (SELECT rowid FROM receipt WHERE id = old.receipt_id);
+    END
+    """,
+]
+
+def rebuild_search_index(conn):
+    """Re-index every receipt from scratch. No-op off SQLite."""
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(sa.text("DELETE FROM receipt_fts"))
+    conn.execute(sa.text("""
+        INSERT INTO receipt_fts (rowid, merchant_name, payment_method, items)
+        SELECT receipt.rowid, merchant_name, payment_method, coalesce(
+            (SELECT group_concat(description, ' ') FROM lineitem WHERE receipt_id = receipt.id), ''
+        )
+        FROM receipt
+    """))
+
+def _create_search_index(conn):
+    if conn.dialect.name != "sqlite" or sa.inspect(conn).has_table("receipt_fts"):
+        return
+    for statement in _SEARCH_INDEX_DDL:
+        conn.execute(sa.text(statement))
+    # Index whatever was there before the table existed
+    rebuild_search_index(conn)
+
+async def create_schema(target_engine=None):
+    """Create and upgrade tables. Works on both SQLite and PostgreSQL."""
+    import app.models.models  # noqa: F401  (registers the tables)
+    
+    async with (target_engine or write_engine).begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(backfill_derived_columns)
+        await conn.run_sync(_create_search_index)
+
+async def init_db():
+    from app.models.models import (
+        Household, User, Category, Receipt, MonthlyCategoryRollup, DailyCategoryRollup,
+        LineItem, DEFAULT_CATEGORIES,
+    )
+    from app.services.line_items import backfill_line_items
+    from app.services.rollups import rebuild_rollups
+    
+    await create_schema()
+    
+    # Rollups start empty on databases that predate them
+    async with async_write_session() as session:
+        has_monthly = (await session.execute(select(MonthlyCategoryRollup).limit(1))).first()
+        has_daily = (await session.execute(select(DailyCategoryRollup).limit(1))).first()
+        has_receipts = (await session.execute(select(Receipt.id).limit(1))).first()
+        if has_receipts and not (has_monthly and has_daily):
+            await rebuild_rollups(session)
+            await session.commit()
+    
+    # Line items likewise, copied out of existing receipts' raw_extraction
+    async with async_write_session() as session:
+        has_line_items = (await session.execute(select(LineItem.id).limit(1))).first()
+        has_scans = (
+            await session.execute(select(Receipt.id).where(Receipt.image_path != None).limit(1))
+        ).first()
+        if has_scans and not has_line_items:
+            await backfill_line_items(session)
+            await session.commit()
     
     # Seed default household, user, and categories if empty
-    async with async_session() as session:
+    async with async_write_session() as session:
         # Check if we need to seed
         result = await session.execute(select(Household))
         if result.first() is not None:
@@ -5,20 +5,41 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.database import init_db
-from app.routers import receipts, budget, categories
+from app.routers import receipts, budget, categories, merchant_rules
+from app.services.claude_client import claude_client
+from app.services.job_queue import job_queue
+from app.services.extraction_cache import cache_stats
+from app.services.dashboard_cache import dashboard_cache
+from app.services.image_processing import image_stats_summary
+from app.services.receipt_processor import categorization_stats, batch_categorization_stats
+from app.services.storage import RequestSizeLimitMiddleware, MULTIPART_OVERHEAD
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create tables
+    # Startup: create tables, resume queued receipt jobs
     await init_db()
+    await job_queue.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background workers
+    await job_queue.stop()
 
 app = FastAPI(
     title=settings.app_name,
     lifespan=lifespan,
 )
 
+# Turn oversized uploads away before their bodies are read. Added first so
+# it runs inside CORSMiddleware and its rejections still carry CORS headers
+upload_limit = settings.max_upload_size_mb * 1024 * 1024 + MULTIPART_OVERHEAD
+upload_error = f"File too large. Max {settings.max_upload_size_mb}MB"
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={
+        "/receipts/upload": (upload_limit, upload_error),
+        "/receipts/upload/batch": (upload_limit * settings.batch_upload_max_files, upload_error),
+    },
+)
+
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Serve uploaded files
@@ -38,7 +60,19 @@ app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads"
 app.include_router(receipts.router)
 app.include_router(budget.router)
 app.include_router(categories.router)
+app.include_router(merchant_rules.router)
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "extraction_cache": cache_stats(),
+        "categorization": categorization_stats,
+        "batch_categorization": batch_categorization_stats,
+        "claude": claude_client.metrics(),
+        "image_processing": image_stats_summary(),
+        "dashboard_cache": dashboard_cache.stats,
+    }
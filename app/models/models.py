@@ -14,6 +14,12 @@ class ExpenseType(str, Enum):
     PERSONAL = "personal"
     HOUSEHOLD = "household"
 
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 # ============================================================
 # DATABASE MODELS
 # ============================================================
@@ -22,6 +28,8 @@ class Household(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped with every write that changes this household's dashboards
+    dashboard_version: int | None = Field(default=0)
     
     users: list["User"] = Relationship(back_populates="household")
     receipts: list["Receipt"] = Relationship(back_populates="household")
@@ -54,6 +62,17 @@ class User(SQLModel, table=True):
     receipts: list["Receipt"] = Relationship(back_populates="user")
 
 class Receipt(SQLModel, table=True):
+    __table_args__ = (
+        sa.Index("ix_receipt_user_id_effective_date", "user_id", "effective_date"),
+        sa.Index("ix_receipt_user_id_import_hash", "user_id", "import_hash"),
+        # Receipts that didn't come from a statement, for import dedup by date
+        sa.Index(
+            "ix_receipt_user_id_effective_date_not_imported", "user_id", "effective_date",
+            sqlite_where=sa.text("import_hash IS NULL"),
+            postgresql_where=sa.text("import_hash IS NULL"),
+        ),
+    )
+    
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id", index=True)
     household_id: UUID | None = Field(default=None, foreign_key="household.id", index=True)
@@ -79,10 +98,39 @@ class Receipt(SQLModel, table=True):
     # Metadata
     raw_extraction: dict = Field(default_factory=dict, sa_type=sa.JSON)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # transaction_date, falling back to created_at; kept in sync on flush
+    effective_date: datetime | None = None
+    # Set on rows loaded from a bank/card statement, for re-import dedup
+    import_hash: str | None = None
     
     user: User = Relationship(back_populates="receipts")
     household: Household | None = Relationship(back_populates="receipts")
     category_rel: Category | None = Relationship(back_populates="receipts")
+    # Line items are removed explicitly on delete; don't lazy-load them for it
+    line_items: list["LineItem"] = Relationship(
+        back_populates="receipt", sa_relationship_kwargs={"passive_deletes": True}
+    )
+
+@sa.event.listens_for(Receipt, "before_insert")
+@sa.event.listens_for(Receipt, "before_update")
+def _sync_effective_date(mapper, connection, target: Receipt):
+    target.effective_date = receipt_effective_date(target)
+
+def receipt_effective_date(receipt: Receipt) -> datetime:
+    """Date a receipt counts towards: when it happened, else when it was added."""
+    return receipt.transaction_date or receipt.created_at
+
+class LineItem(SQLModel, table=True):
+    """One line of a scanned receipt, copied out of raw_extraction for querying."""
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    receipt_id: UUID = Field(foreign_key="receipt.id", index=True)
+    position: int = 0  # Order on the receipt
+    description: str
+    normalized_description: str = Field(index=True)  # See services/line_items.py
+    quantity: Decimal | None = Field(default=None, sa_type=sa.Numeric(10, 3))
+    total_price: Decimal | None = Field(default=None, sa_type=sa.Numeric(10, 2))
+    
+    receipt: Receipt = Relationship(back_populates="line_items")
 
 class Budget(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
@@ -95,6 +143,75 @@ class Budget(SQLModel, table=True):
     household: Household = Relationship(back_populates="budgets")
     category_rel: Category = Relationship(back_populates="budgets")
 
+class MonthlyCategoryRollup(SQLModel, table=True):
+    """Spending per (household, user, month, category), kept in step with receipt writes."""
+    household_id: UUID = Field(foreign_key="household.id", primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    year_month: str = Field(primary_key=True)  # "2026-10"
+    category_id: UUID = Field(foreign_key="category.id", primary_key=True)
+    total: Decimal = Field(default=Decimal("0"), sa_type=sa.Numeric(12, 2))
+    receipt_count: int = 0
+
+class DailyCategoryRollup(SQLModel, table=True):
+    """Spending per (household, user, day, category), kept in step with receipt writes."""
+    household_id: UUID = Field(foreign_key="household.id", primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    day: str = Field(primary_key=True)  # "2026-10-05"
+    category_id: UUID = Field(foreign_key="category.id", primary_key=True)
+    total: Decimal = Field(default=Decimal("0"), sa_type=sa.Numeric(12, 2))
+    receipt_count: int = 0
+
+class ReceiptJob(SQLModel, table=True):
+    """Queued receipt upload awaiting background processing."""
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id", index=True)
+    household_id: UUID | None = Field(default=None, foreign_key="household.id")
+    
+    # Stored upload to process
+    image_path: str
+    media_type: str
+    
+    # Progress
+    status: JobStatus = Field(default=JobStatus.PENDING, index=True)
+    attempts: int = 0
+    error: str | None = None
+    receipt_id: UUID | None = Field(default=None, foreign_key="receipt.id")
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ExtractionCacheEntry(SQLModel, table=True):
+    """Vision extraction result keyed by the SHA-256 of the image bytes."""
+    image_hash: str = Field(primary_key=True)
+    extraction: dict = Field(default_factory=dict, sa_type=sa.JSON)
+    # Claude fallback categorization for this image, if one was needed
+    category_slug: str | None = None
+    category_confidence: float | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class MerchantCategory(SQLModel, table=True):
+    """Household merchant -> category mapping learned from user corrections."""
+    __table_args__ = (sa.UniqueConstraint("household_id", "merchant_key"),)
+    
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    household_id: UUID = Field(foreign_key="household.id", index=True)
+    merchant_key: str  # normalize_merchant() output: "corner bistro"
+    category_id: UUID = Field(foreign_key="category.id")
+    times_confirmed: int = 1
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MerchantRule(SQLModel, table=True):
+    """User-defined merchant substring rule. No household means it applies to all."""
+    __table_args__ = (sa.UniqueConstraint("household_id", "pattern"),)
+    
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    household_id: UUID | None = Field(default=None, foreign_key="household.id", index=True)
+    pattern: str  # Lowercase substring: "corner bistro"
+    category_id: UUID = Field(foreign_key="category.id")
+    confidence: float = 0.95
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 
 # ============================================================
 # DEFAULT CATEGORIES (seed data)
@@ -1,19 +1,26 @@
 from datetime import datetime
 from decimal import Decimal
+from itertools import accumulate
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 from sqlmodel import select
 from calendar import monthrange
 
-from app.database import get_session
-from app.config import settings
-from app.models.models import Receipt, Budget, Category
+from app.database import get_session, get_write_session
+from app.models.models import (
+    Receipt, Budget, Category, MonthlyCategoryRollup, DailyCategoryRollup
+)
 from app.schemas.schemas import (
-    BudgetDashboard, BudgetCategorySummary, BudgetSetRequest, 
-    ReceiptListItem, CategoryResponse
+    BudgetDashboard, BudgetCategorySummary, BudgetSetRequest, CategoryResponse,
+    BudgetTrends, BudgetTrendMonth, BudgetTrendCategory,
+    BudgetDaily, BudgetDailyMonth, BudgetDailyCategory,
+)
+from app.services.dashboard_cache import (
+    dashboard_cache, dashboard_version, etag_matches, mark_dashboards_stale,
 )
+from app.services.receipt_queries import receipt_list_query, row_to_list_item
 
 router = APIRouter(prefix="/budget", tags=["budget"])
 
@@ -33,16 +40,42 @@ def category_to_response(cat: Category) -> CategoryResponse:
 @router.get("", response_model=BudgetDashboard)
 async def get_budget_dashboard(
     session: AsyncSession = Depends(get_session),
-    year: int = Query(default=None),
+    year: int = Query(default=None, ge=1, le=9999),
     month: int = Query(default=None, ge=1, le=12),
+    if_none_match: str | None = Header(default=None),
 ):
-    """Get budget overview for a specific month. Defaults to current month."""
+    """Get budget overview for a specific month. Defaults to current month.
+    
+    Responses are cached until a receipt, budget or category changes and
+    carry an ETag; a matching If-None-Match gets an empty 304.
+    """
     now = datetime.utcnow()
     
     # Use provided year/month or default to current
     target_year = year if year else now.year
     target_month = month if month else now.month
+    month_str = f"{target_year}-{target_month:02d}"
     
+    version = await dashboard_version(session, TEMP_HOUSEHOLD_ID)
+    cached = dashboard_cache.get(TEMP_HOUSEHOLD_ID, month_str, version)
+    if cached:
+        etag, body = cached
+    else:
+        dashboard = await build_budget_dashboard(session, target_year, target_month)
+        body = dashboard.model_dump_json().encode()
+        etag = dashboard_cache.put(TEMP_HOUSEHOLD_ID, month_str, body, version)
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def build_budget_dashboard(
+    session: AsyncSession,
+    target_year: int,
+    target_month: int,
+) -> BudgetDashboard:
+    """Assemble the dashboard for one month straight from the database."""
     # Calculate month boundaries
     month_start = datetime(target_year, target_month, 1, 0, 0, 0)
     last_day = monthrange(target_year, target_month)[1]
@@ -58,18 +91,12 @@ async def get_budget_dashboard(
     cat_result = await session.execute(cat_query)
     categories = {c.id: c for c in cat_result.scalars().all()}
     
-    # Get spending by category for target month (use transaction_date, fall back to created_at)
+    # Get spending by category for target month from the maintained rollups
     spending_query = (
-        select(Receipt.category_id, func.sum(Receipt.grand_total))
-        .where(Receipt.user_id == TEMP_USER_ID)
-        .where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) >= month_start
-        )
-        .where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) <= month_end
-        )
-        .where(Receipt.category_id != None)
-        .group_by(Receipt.category_id)
+        select(MonthlyCategoryRollup.category_id, MonthlyCategoryRollup.total)
+        .where(MonthlyCategoryRollup.household_id == TEMP_HOUSEHOLD_ID)
+        .where(MonthlyCategoryRollup.user_id == TEMP_USER_ID)
+        .where(MonthlyCategoryRollup.year_month == month_str)
     )
     spending_result = await session.execute(spending_query)
     spending_by_cat = {row[0]: row[1] for row in spending_result.all()}
@@ -107,33 +134,17 @@ async def get_budget_dashboard(
                 percent_used=round(percent, 1),
             ))
     
-    # Get recent receipts for target month (use transaction_date, fall back to created_at)
+    # Get recent receipts for target month (effective_date = transaction_date, else created_at)
     recent_query = (
-        select(Receipt)
+        receipt_list_query(active_categories_only=True)
         .where(Receipt.user_id == TEMP_USER_ID)
-        .where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) >= month_start
-        )
-        .where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) <= month_end
-        )
-        .order_by(func.coalesce(Receipt.transaction_date, Receipt.created_at).desc())
+        .where(Receipt.effective_date >= month_start)
+        .where(Receipt.effective_date <= month_end)
+        .order_by(Receipt.effective_date.desc())
         .limit(10)
     )
     recent_result = await session.execute(recent_query)
-    recent_receipts = [
-        ReceiptListItem(
-            id=r.id,
-            merchant_name=r.merchant_name,
-            transaction_date=r.transaction_date,
-            grand_total=r.grand_total,
-            category=category_to_response(categories[r.category_id]) if r.category_id in categories else None,
-            expense_type=r.expense_type,
-            needs_review=r.category_confidence < settings.category_confidence_threshold,
-            created_at=r.created_at,
-        )
-        for r in recent_result.scalars().all()
-    ]
+    recent_receipts = [row_to_list_item(row) for row in recent_result.all()]
     
     return BudgetDashboard(
         month=month_str,
@@ -144,11 +155,257 @@ async def get_budget_dashboard(
         recent_receipts=recent_receipts,
     )
 
+MAX_TREND_MONTHS = 120
+
+def parse_month(value: str) -> tuple[int, int]:
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise HTTPException(400, f"Invalid month {value!r}, expected YYYY-MM")
+    # datetime only goes from year 1 to 9999
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        raise HTTPException(400, f"Invalid month {value!r}, expected YYYY-MM")
+    return year, month
+
+def month_range(start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+    year, month = start
+    months = []
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def resolve_month_range(from_month: str | None, to_month: str | None) -> list[tuple[int, int]]:
+    """Months from..to inclusive; defaults to the twelve ending this month."""
+    now = datetime.utcnow()
+    end = parse_month(to_month) if to_month else (now.year, now.month)
+    if from_month:
+        start = parse_month(from_month)
+    else:
+        start = (end[0] - 1, end[1] + 1) if end[1] < 12 else (end[0], 1)
+        start = max(start, (1, 1))
+    
+    months = month_range(start, end)
+    if not months:
+        raise HTTPException(400, "from must not be after to")
+    if len(months) > MAX_TREND_MONTHS:
+        raise HTTPException(400, f"Range too long. Max {MAX_TREND_MONTHS} months")
+    return months
+
+async def load_budget_versions(
+    session: AsyncSession,
+    months: list[tuple[int, int]],
+) -> list[Budget]:
+    """Every budget version overlapping the months, oldest first."""
+    range_start = datetime(months[0][0], months[0][1], 1, 0, 0, 0)
+    last_year, last_month = months[-1]
+    range_end = datetime(last_year, last_month, monthrange(last_year, last_month)[1], 23, 59, 59)
+    budget_query = (
+        select(Budget)
+        .where(Budget.household_id == TEMP_HOUSEHOLD_ID)
+        .where(Budget.effective_from <= range_end)
+        .where((Budget.effective_to == None) | (Budget.effective_to >= range_start))
+        .order_by(Budget.effective_from)
+    )
+    budget_result = await session.execute(budget_query)
+    return budget_result.scalars().all()
+
+def limits_for_month(budgets: list[Budget], year: int, month: int) -> dict[UUID, Decimal]:
+    """Same overlap rule as the dashboard; the latest version wins."""
+    month_start = datetime(year, month, 1, 0, 0, 0)
+    month_end = datetime(year, month, monthrange(year, month)[1], 23, 59, 59)
+    return {
+        b.category_id: b.monthly_limit
+        for b in budgets
+        if b.effective_from <= month_end
+        and (b.effective_to is None or b.effective_to >= month_start)
+    }
+
+async def load_active_categories(session: AsyncSession) -> list[Category]:
+    cat_query = select(Category).where(
+        Category.household_id == TEMP_HOUSEHOLD_ID,
+        Category.is_active == True
+    ).order_by(Category.sort_order)
+    cat_result = await session.execute(cat_query)
+    return cat_result.scalars().all()
+
+@router.get("/trends", response_model=BudgetTrends)
+async def get_budget_trends(
+    session: AsyncSession = Depends(get_session),
+    from_month: str | None = Query(default=None, alias="from"),
+    to_month: str | None = Query(default=None, alias="to"),
+):
+    """Spent and limit per category for every month in a range (YYYY-MM, inclusive).
+    
+    Defaults to the twelve months ending with the current one.
+    """
+    months = resolve_month_range(from_month, to_month)
+    month_keys = [f"{y}-{m:02d}" for y, m in months]
+    
+    categories = await load_active_categories(session)
+    
+    # Spending for the whole range in one pass over the monthly rollups
+    spending_query = (
+        select(
+            MonthlyCategoryRollup.year_month,
+            MonthlyCategoryRollup.category_id,
+            func.sum(MonthlyCategoryRollup.total),
+        )
+        .where(MonthlyCategoryRollup.household_id == TEMP_HOUSEHOLD_ID)
+        .where(MonthlyCategoryRollup.user_id == TEMP_USER_ID)
+        .where(MonthlyCategoryRollup.year_month >= month_keys[0])
+        .where(MonthlyCategoryRollup.year_month <= month_keys[-1])
+        .group_by(MonthlyCategoryRollup.year_month, MonthlyCategoryRollup.category_id)
+    )
+    spending_result = await session.execute(spending_query)
+    spending = {(row[0], row[1]): row[2] for row in spending_result.all()}
+    
+    # Budget versions for the whole range, resolved per month below
+    budgets = await load_budget_versions(session, months)
+    
+    trend_months = []
+    for (year, month), month_str in zip(months, month_keys):
+        limits = limits_for_month(budgets, year, month)
+        
+        by_category = []
+        total_budget = Decimal("0")
+        total_spent = Decimal("0")
+        for category in categories:
+            limit = limits.get(category.id, Decimal("0"))
+            spent = spending.get((month_str, category.id), Decimal("0"))
+            total_budget += limit
+            total_spent += spent
+            if limit > 0 or spent > 0:
+                by_category.append(BudgetTrendCategory(
+                    category_id=category.id,
+                    monthly_limit=limit,
+                    spent=spent,
+                ))
+        
+        trend_months.append(BudgetTrendMonth(
+            month=month_str,
+            total_budget=total_budget,
+            total_spent=total_spent,
+            by_category=by_category,
+        ))
+    
+    return BudgetTrends(
+        from_month=month_keys[0],
+        to_month=month_keys[-1],
+        categories=[category_to_response(c) for c in categories],
+        months=trend_months,
+    )
+
+@router.get("/daily", response_model=BudgetDaily)
+async def get_budget_daily(
+    session: AsyncSession = Depends(get_session),
+    from_month: str | None = Query(default=None, alias="from"),
+    to_month: str | None = Query(default=None, alias="to"),
+):
+    """Cumulative daily spending per category, with a projected month-end.
+    
+    Covers the months from..to (YYYY-MM, inclusive), defaulting to the current
+    month only. The projection extends the month-to-date daily rate to the end
+    of the month; finished months project their actual total.
+    """
+    now = datetime.utcnow()
+    if not from_month and not to_month:
+        from_month = to_month = f"{now.year}-{now.month:02d}"
+    months = resolve_month_range(from_month, to_month)
+    
+    categories = await load_active_categories(session)
+    
+    first_day = f"{months[0][0]}-{months[0][1]:02d}-01"
+    last_day = f"{months[-1][0]}-{months[-1][1]:02d}-31"
+    daily_query = (
+        select(
+            DailyCategoryRollup.day,
+            DailyCategoryRollup.category_id,
+            func.sum(DailyCategoryRollup.total),
+        )
+        .where(DailyCategoryRollup.household_id == TEMP_HOUSEHOLD_ID)
+        .where(DailyCategoryRollup.user_id == TEMP_USER_ID)
+        .where(DailyCategoryRollup.day >= first_day)
+        .where(DailyCategoryRollup.day <= last_day)
+        .group_by(DailyCategoryRollup.day, DailyCategoryRollup.category_id)
+    )
+    daily_result = await session.execute(daily_query)
+    
+    # (year_month, category_id) -> dense per-day amounts
+    series: dict[tuple[str, UUID], list[Decimal]] = {}
+    for day, category_id, total in daily_result.all():
+        year, month, day_of_month = (int(part) for part in day.split("-"))
+        days = series.get((day[:7], category_id))
+        if days is None:
+            days = [Decimal("0.00")] * monthrange(year, month)[1]
+            series[(day[:7], category_id)] = days
+        days[day_of_month - 1] = total
+    
+    budgets = await load_budget_versions(session, months)
+    
+    daily_months = []
+    for year, month in months:
+        month_str = f"{year}-{month:02d}"
+        days_in_month = monthrange(year, month)[1]
+        if (year, month) < (now.year, now.month):
+            days_elapsed = days_in_month
+        elif (year, month) == (now.year, now.month):
+            days_elapsed = now.day
+        else:
+            days_elapsed = 0
+        limits = limits_for_month(budgets, year, month)
+        
+        by_category = []
+        for category in categories:
+            limit = limits.get(category.id, Decimal("0"))
+            days = series.get((month_str, category.id))
+            if days is None and limit == 0:
+                continue
+            cumulative = list(accumulate(days or [Decimal("0.00")] * days_in_month))
+            spent = cumulative[-1]
+            
+            projected = spent
+            over_on = None
+            if days_elapsed:
+                to_date = cumulative[days_elapsed - 1]
+                rate = to_date / days_elapsed
+                if days_elapsed < days_in_month:
+                    projected = (rate * days_in_month).quantize(Decimal("0.01"))
+                if limit > 0 and projected > limit:
+                    if to_date > limit:
+                        over_on = next(i + 1 for i, total in enumerate(cumulative) if total > limit)
+                    else:
+                        # First day the month-to-date rate carries spending past the limit
+                        over_on = days_elapsed + int((limit - to_date) / rate) + 1
+            
+            by_category.append(BudgetDailyCategory(
+                category_id=category.id,
+                monthly_limit=limit,
+                spent=spent,
+                cumulative=cumulative,
+                projected_month_end=projected,
+                projected_over_on=over_on,
+            ))
+        
+        daily_months.append(BudgetDailyMonth(
+            month=month_str,
+            days_in_month=days_in_month,
+            days_elapsed=days_elapsed,
+            by_category=by_category,
+        ))
+    
+    return BudgetDaily(
+        from_month=daily_months[0].month,
+        to_month=daily_months[-1].month,
+        categories=[category_to_response(c) for c in categories],
+        months=daily_months,
+    )
+
 @router.put("/categories/{category_id}")
 async def set_category_budget(
     category_id: UUID,
     request: BudgetSetRequest,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Set or update budget limit for a category for a specific month."""
     category = await session.get(Category, category_id)
@@ -190,6 +447,7 @@ async def set_category_budget(
         effective_to=month_end if request.year and request.month else None,
     )
     session.add(new_budget)
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     
     return {
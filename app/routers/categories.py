@@ -3,9 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.database import get_session
+from app.database import get_session, get_write_session
 from app.models.models import Category
 from app.schemas.schemas import CategoryResponse, CategoryCreate, CategoryUpdate
+from app.services.dashboard_cache import mark_dashboards_stale
+from app.services.receipt_processor import matchers
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
@@ -28,7 +30,7 @@ async def list_categories(
 @router.post("", response_model=CategoryResponse)
 async def create_category(
     data: CategoryCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Create a new category."""
     # Check slug uniqueness
@@ -48,6 +50,7 @@ async def create_category(
         sort_order=data.sort_order,
     )
     session.add(category)
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     await session.refresh(category)
     return category
@@ -56,7 +59,7 @@ async def create_category(
 async def update_category(
     category_id: UUID,
     data: CategoryUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Update a category."""
     category = await session.get(Category, category_id)
@@ -74,14 +77,19 @@ async def update_category(
     if data.sort_order is not None:
         category.sort_order = data.sort_order
     
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     await session.refresh(category)
+    
+    # Merchant rules resolve to slugs, so reload them on the next match
+    if data.slug is not None:
+        matchers.invalidate(TEMP_HOUSEHOLD_ID)
     return category
 
 @router.delete("/{category_id}")
 async def delete_category(
     category_id: UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Soft-delete a category (sets is_active=False)."""
     category = await session.get(Category, category_id)
@@ -89,5 +97,6 @@ async def delete_category(
         raise HTTPException(404, "Category not found")
     
     category.is_active = False
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     return {"deleted": True}
\ No newline at end of file
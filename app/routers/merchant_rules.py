@@ -0,0 +1,93 @@
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import get_session, get_write_session
+from app.models.models import Category, MerchantRule
+from app.schemas.schemas import MerchantRuleCreate, MerchantRuleResponse, CategoryResponse
+from app.services.receipt_processor import matchers
+
+router = APIRouter(prefix="/merchant-rules", tags=["merchant-rules"])
+
+TEMP_HOUSEHOLD_ID = UUID("00000000-0000-0000-0000-000000000002")
+
+def rule_to_response(rule: MerchantRule, cat: Category) -> MerchantRuleResponse:
+    return MerchantRuleResponse(
+        id=rule.id,
+        pattern=rule.pattern,
+        category=CategoryResponse(
+            id=cat.id,
+            name=cat.name,
+            slug=cat.slug,
+            icon=cat.icon,
+            is_active=cat.is_active,
+            sort_order=cat.sort_order,
+        ),
+        confidence=rule.confidence,
+    )
+
+@router.get("", response_model=list[MerchantRuleResponse])
+async def list_merchant_rules(
+    session: AsyncSession = Depends(get_session),
+):
+    """List the household's merchant rules."""
+    query = (
+        select(MerchantRule, Category)
+        .join(Category, Category.id == MerchantRule.category_id)
+        .where(MerchantRule.household_id == TEMP_HOUSEHOLD_ID)
+        .order_by(MerchantRule.pattern)
+    )
+    result = await session.execute(query)
+    return [rule_to_response(rule, cat) for rule, cat in result.all()]
+
+@router.post("", response_model=MerchantRuleResponse)
+async def create_merchant_rule(
+    data: MerchantRuleCreate,
+    session: AsyncSession = Depends(get_write_session),
+):
+    """Add a merchant rule: any merchant name containing pattern gets the category."""
+    pattern = data.pattern.strip().lower()
+    if not pattern:
+        raise HTTPException(400, "Pattern cannot be empty")
+    
+    category = await session.get(Category, data.category_id)
+    if not category or category.household_id != TEMP_HOUSEHOLD_ID:
+        raise HTTPException(400, "Invalid category")
+    
+    existing = await session.execute(
+        select(MerchantRule)
+        .where(MerchantRule.household_id == TEMP_HOUSEHOLD_ID)
+        .where(MerchantRule.pattern == pattern)
+    )
+    if existing.first():
+        raise HTTPException(400, f"Rule for '{pattern}' already exists")
+    
+    rule = MerchantRule(
+        household_id=TEMP_HOUSEHOLD_ID,
+        pattern=pattern,
+        category_id=category.id,
+        confidence=data.confidence,
+    )
+    session.add(rule)
+    await session.commit()
+    await session.refresh(rule)
+    
+    matchers.rule_added(rule, category.slug)
+    return rule_to_response(rule, category)
+
+@router.delete("/{rule_id}")
+async def delete_merchant_rule(
+    rule_id: UUID,
+    session: AsyncSession = Depends(get_write_session),
+):
+    """Delete a merchant rule."""
+    rule = await session.get(MerchantRule, rule_id)
+    if not rule or rule.household_id != TEMP_HOUSEHOLD_ID:
+        raise HTTPException(404, "Rule not found")
+    
+    await session.delete(rule)
+    await session.commit()
+    
+    matchers.rule_removed(rule)
+    return {"deleted": True}
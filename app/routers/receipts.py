@@ -1,21 +1,52 @@
-from datetime import datetime
+import asyncio
+import base64
+import csv
+import io
+from datetime import date, datetime, time
 from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 from calendar import monthrange
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func
+from sqlalchemy import delete, func, update
 from sqlmodel import select
 
-from app.database import get_session
+from app.database import get_session, get_write_session, async_session, async_write_session
 from app.config import settings
-from app.models.models import Receipt, Category, ExpenseType
+from app.models.models import Receipt, Category, ExpenseType, ReceiptJob, LineItem
 from app.schemas.schemas import (
     ReceiptUploadResponse, ReceiptDetail, ReceiptUpdate, ReceiptListItem, 
-    ManualEntryRequest, CategoryResponse
+    ManualEntryRequest, CategoryResponse, ReceiptJobResponse,
+    BatchUploadItem, BatchUploadResponse, StatementImportResponse,
+    ReceiptBulkUpdate, ReceiptBulkUpdateResponse, LineItemSummary, LineItemSpending,
+    ReceiptSearchHit,
+)
+from app.services.claude_client import ClaudeUnavailableError
+from app.services.dashboard_cache import mark_dashboards_stale
+from app.services.job_queue import job_queue
+from app.services.receipt_processor import (
+    process_receipt, load_category_options, build_receipt, categorize_pending
+)
+from app.services.line_items import normalize_item, receipt_line_items
+from app.services.merchant_memory import remember_merchant_category, remember_merchant_categories
+from app.services.receipt_queries import (
+    receipt_list_query, row_to_list_item, receipt_export_query,
+    export_csv_header, export_csv_rows, export_ndjson_rows,
+    search_terms, receipt_search_query, search_term_counts_query,
+)
+from app.services.rollups import (
+    apply_rollup, apply_rollup_change, apply_rollups, rollup_entry, day_sql
+)
+from app.services.statement_import import (
+    import_statement, read_statement, StatementFormatError
+)
+from app.services.storage import (
+    save_receipt_upload, receipt_image_path, delete_receipt_upload, get_receipt_url,
+    UploadTooLargeError,
 )
-from app.services.receipt_processor import process_receipt
-from app.services.storage import save_receipt_image, get_receipt_url
 
 router = APIRouter(prefix="/receipts", tags=["receipts"])
 
@@ -37,7 +68,7 @@ def category_to_response(cat: Category | None) -> CategoryResponse | None:
 @router.post("/manual", response_model=ReceiptDetail)
 async def create_manual_entry(
     entry: ManualEntryRequest,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Manually add an expense without a receipt image."""
     # Verify category exists
@@ -47,6 +78,7 @@ async def create_manual_entry(
     
     receipt = Receipt(
         user_id=TEMP_USER_ID,
+        household_id=TEMP_HOUSEHOLD_ID,
         image_path=None,
         merchant_name=entry.merchant_name,
         transaction_date=entry.transaction_date or datetime.utcnow(),
@@ -58,6 +90,11 @@ async def create_manual_entry(
     )
     
     session.add(receipt)
+    await apply_rollup(session, rollup_entry(receipt))
+    await remember_merchant_category(
+        session, TEMP_HOUSEHOLD_ID, receipt.merchant_name, receipt.category_id
+    )
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     await session.refresh(receipt)
     
@@ -78,89 +115,310 @@ async def create_manual_entry(
         created_at=receipt.created_at,
     )
 
-@router.post("/upload", response_model=ReceiptUploadResponse)
+def receipt_to_upload_response(
+    receipt: Receipt, category: Category | None, result: dict | None = None
+) -> ReceiptUploadResponse:
+    """result is the process_receipt output, when the receipt was just processed."""
+    return ReceiptUploadResponse(
+        id=receipt.id,
+        merchant_name=receipt.merchant_name,
+        transaction_date=receipt.transaction_date,
+        grand_total=receipt.grand_total,
+        category=category_to_response(category),
+        category_confidence=receipt.category_confidence,
+        needs_review=receipt.category_confidence < settings.category_confidence_threshold,
+        image_url=get_receipt_url(receipt.image_path),
+        extraction_cached=result["extraction_cached"] if result else None,
+        image_stats=result["image_stats"] if result else None,
+    )
+
+async def job_to_response(job: ReceiptJob, session: AsyncSession) -> ReceiptJobResponse:
+    receipt_response = None
+    if job.receipt_id:
+        receipt = await session.get(Receipt, job.receipt_id)
+        if receipt:
+            category = await session.get(Category, receipt.category_id) if receipt.category_id else None
+            receipt_response = receipt_to_upload_response(receipt, category)
+    
+    return ReceiptJobResponse(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        receipt=receipt_response,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+async def enqueue_upload(image_path: str, media_type: str, session: AsyncSession) -> ReceiptJobResponse:
+    job = await job_queue.enqueue(
+        user_id=TEMP_USER_ID,
+        household_id=TEMP_HOUSEHOLD_ID,
+        image_path=image_path,
+        media_type=media_type,
+    )
+    return await job_to_response(job, session)
+
+@router.post(
+    "/upload",
+    response_model=ReceiptUploadResponse,
+    responses={202: {"model": ReceiptJobResponse}},
+)
 async def upload_receipt(
     file: UploadFile = File(...),
+    background: bool = Query(default=False),
     session: AsyncSession = Depends(get_session),
 ):
-    """Upload a receipt image for processing."""
+    """Upload a receipt image for processing.
+    
+    With background=true the image is stored and queued, and the response is
+    a 202 with a job to poll at GET /receipts/jobs/{id}. The same happens if
+    the Claude API is rate limiting or down.
+    """
     if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
         raise HTTPException(400, "File must be JPEG, PNG, or WebP image")
     
-    image_bytes = await file.read()
-    if len(image_bytes) > settings.max_upload_size_mb * 1024 * 1024:
+    try:
+        stored = await save_receipt_upload(file, settings.max_upload_size_mb * 1024 * 1024)
+    except UploadTooLargeError:
         raise HTTPException(400, f"File too large. Max {settings.max_upload_size_mb}MB")
+    image_path = stored.relative_path
     
-    image_path = await save_receipt_image(image_bytes, file.filename)
+    if background:
+        job_response = await enqueue_upload(image_path, file.content_type, session)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job_response))
     
     # Get available categories for the processor
+    categories = await load_category_options(session, TEMP_HOUSEHOLD_ID)
+    await session.commit()  # Don't hold a read transaction across the API calls
+    
+    try:
+        result = await process_receipt(
+            receipt_image_path(image_path),
+            file.content_type,
+            categories,
+            image_hash=stored.sha256,
+            household_id=TEMP_HOUSEHOLD_ID,
+        )
+    except ClaudeUnavailableError:
+        # The job queue retries once the API recovers
+        job_response = await enqueue_upload(image_path, file.content_type, session)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job_response))
+    except Exception as e:
+        raise HTTPException(500, f"Failed to process receipt: {str(e)}")
+    
+    receipt = build_receipt(result, image_path, TEMP_USER_ID, TEMP_HOUSEHOLD_ID)
+    
+    async with async_write_session() as write_session:
+        write_session.add(receipt)
+        write_session.add_all(receipt_line_items(receipt))
+        await apply_rollup(write_session, rollup_entry(receipt))
+        await mark_dashboards_stale(write_session, TEMP_HOUSEHOLD_ID)
+        await write_session.commit()
+        await write_session.refresh(receipt)
+    
+    # Load category for response
+    category = await session.get(Category, receipt.category_id) if receipt.category_id else None
+    
+    return receipt_to_upload_response(receipt, category, result)
+
+@router.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_receipt_batch(
+    files: list[UploadFile] = File(...),
+    session: AsyncSession = Depends(get_session),
+):
+    """Upload many receipt images at once.
+    
+    Files are processed concurrently (batch_upload_concurrency at a time) and
+    all successful receipts are saved in one transaction. Each file gets its
+    own result, so one bad image doesn't fail the batch. Receipts that need
+    Claude to categorize them are sent together, many merchants per call.
+    Files that can't be processed while the Claude API is unavailable are
+    queued as jobs instead.
+    """
+    if len(files) > settings.batch_upload_max_files:
+        raise HTTPException(400, f"Too many files. Max {settings.batch_upload_max_files}")
+    
+    # Categories are loaded once for the whole batch
     cat_query = select(Category).where(
         Category.household_id == TEMP_HOUSEHOLD_ID,
         Category.is_active == True
     )
     cat_result = await session.execute(cat_query)
+    categories_by_id = {c.id: c for c in cat_result.scalars().all()}
     categories = [
-        {"id": c.id, "slug": c.slug, "name": c.name} 
-        for c in cat_result.scalars().all()
+        {"id": c.id, "slug": c.slug, "name": c.name}
+        for c in categories_by_id.values()
     ]
+    await session.commit()  # Don't hold a read transaction across the API calls
     
-    try:
-        result = await process_receipt(image_bytes, file.content_type, categories)
-    except Exception as e:
-        raise HTTPException(500, f"Failed to process receipt: {str(e)}")
+    semaphore = asyncio.Semaphore(settings.batch_upload_concurrency)
+    jobs = {}  # File index -> job, for files deferred to the queue
     
-    tx_date = None
-    if result.get("transaction_date"):
+    async def handle(index: int, file: UploadFile) -> tuple[dict | None, str | None, str | None]:
+        if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
+            return None, None, "File must be JPEG, PNG, or WebP image"
         try:
-            tx_date = datetime.fromisoformat(result["transaction_date"])
-        except ValueError:
-            pass
+            stored = await save_receipt_upload(file, settings.max_upload_size_mb * 1024 * 1024)
+        except UploadTooLargeError:
+            return None, None, f"File too large. Max {settings.max_upload_size_mb}MB"
+        
+        async with semaphore:
+            try:
+                result = await process_receipt(
+                    receipt_image_path(stored.relative_path),
+                    file.content_type,
+                    categories,
+                    image_hash=stored.sha256,
+                    household_id=TEMP_HOUSEHOLD_ID,
+                    claude_fallback=False,
+                )
+            except ClaudeUnavailableError:
+                jobs[index] = await enqueue_upload(stored.relative_path, file.content_type, session)
+                return None, None, None
+            except Exception as e:
+                delete_receipt_upload(stored.relative_path)
+                return None, None, f"Failed to process receipt: {str(e)}"
+        return result, stored.relative_path, None
     
-    receipt = Receipt(
-        user_id=TEMP_USER_ID,
-        image_path=image_path,
-        merchant_name=result.get("merchant_name"),
-        transaction_date=tx_date,
-        subtotal=Decimal(str(result["subtotal"])) if result.get("subtotal") else None,
-        tax=Decimal(str(result["tax"])) if result.get("tax") else None,
-        tip=Decimal(str(result["tip"])) if result.get("tip") else None,
-        grand_total=Decimal(str(result["grand_total"])),
-        payment_method=result.get("payment_method"),
-        category_id=result.get("category_id"),
-        category_confidence=result["category_confidence"],
-        raw_extraction=result["raw_extraction"],
-    )
+    processed = await asyncio.gather(*(handle(i, f) for i, f in enumerate(files)))
     
-    session.add(receipt)
-    await session.commit()
-    await session.refresh(receipt)
+    # Merchants nothing cheaper could place share batched Claude calls
+    await categorize_pending([result for result, _, _ in processed if result], categories)
     
-    # Load category for response
-    category = await session.get(Category, receipt.category_id) if receipt.category_id else None
-    needs_review = receipt.category_confidence < settings.category_confidence_threshold
+    outcomes = []
+    for result, image_path, error in processed:
+        if result is None:
+            outcomes.append((None, error))
+            continue
+        try:
+            receipt = build_receipt(result, image_path, TEMP_USER_ID, TEMP_HOUSEHOLD_ID)
+        except Exception as e:
+            delete_receipt_upload(image_path)
+            outcomes.append((None, f"Failed to process receipt: {str(e)}"))
+            continue
+        outcomes.append((receipt, None))
     
-    return ReceiptUploadResponse(
-        id=receipt.id,
-        merchant_name=receipt.merchant_name,
-        transaction_date=receipt.transaction_date,
-        grand_total=receipt.grand_total,
-        category=category_to_response(category),
-        category_confidence=receipt.category_confidence,
-        needs_review=needs_review,
-        image_url=get_receipt_url(receipt.image_path),
+    receipts = [receipt for receipt, _ in outcomes if receipt]
+    async with async_write_session() as write_session:
+        try:
+            write_session.add_all(receipts)
+            for receipt in receipts:
+                write_session.add_all(receipt_line_items(receipt))
+                await apply_rollup(write_session, rollup_entry(receipt))
+            await mark_dashboards_stale(write_session, TEMP_HOUSEHOLD_ID)
+            await write_session.commit()
+        except BaseException:
+            for receipt in receipts:
+                delete_receipt_upload(receipt.image_path)
+            raise
+        # Reload as stored (e.g. money at its column scale), the way the
+        # single upload's refresh does, in one query
+        if receipts:
+            await write_session.execute(
+                select(Receipt)
+                .where(Receipt.id.in_([receipt.id for receipt in receipts]))
+                .execution_options(populate_existing=True)
+            )
+    
+    results = [
+        BatchUploadItem(
+            filename=file.filename,
+            receipt=receipt_to_upload_response(
+                receipt, categories_by_id.get(receipt.category_id), result
+            ) if receipt else None,
+            error=error,
+            job=jobs.get(i),
+        )
+        for i, (file, (receipt, error), (result, _, _)) in enumerate(zip(files, outcomes, processed))
+    ]
+    return BatchUploadResponse(
+        succeeded=len(receipts),
+        failed=len(files) - len(receipts) - len(jobs),
+        queued=len(jobs),
+        results=results,
     )
 
+@router.post("/import", response_model=StatementImportResponse)
+async def import_statement_file(
+    file: UploadFile = File(...),
+    format: Literal["csv", "ofx"] | None = Query(default=None),
+    use_claude: bool = Query(default=True),
+):
+    """Import card/bank transactions from a CSV or OFX/QFX statement.
+    
+    Each spending row becomes a receipt without an image. Rows already
+    imported, or matching a receipt with the same date and total, are
+    skipped. Claude is only asked about merchants neither learned choices
+    nor rules can place (use_claude=false leaves those as Other).
+    """
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        # Format sniffing reads the spooled upload, which may be on disk
+        transactions = await asyncio.to_thread(read_statement, text, file.filename, format)
+        result = await import_statement(
+            transactions,
+            TEMP_USER_ID,
+            TEMP_HOUSEHOLD_ID,
+            use_claude=use_claude,
+        )
+    except (StatementFormatError, csv.Error) as e:
+        raise HTTPException(400, f"Could not read statement: {str(e)}")
+    finally:
+        text.detach()
+    
+    return StatementImportResponse(
+        imported=result.imported,
+        duplicates=result.duplicates,
+        skipped=result.skipped,
+        claude_calls=result.claude_calls,
+        categorized=dict(result.categorized),
+    )
+
+@router.get("/jobs/{job_id}", response_model=ReceiptJobResponse)
+async def get_receipt_job(
+    job_id: UUID,
+    session: AsyncSession = Depends(get_session),
+):
+    """Get the status of a background receipt upload."""
+    job = await session.get(ReceiptJob, job_id)
+    if not job or job.user_id != TEMP_USER_ID:
+        raise HTTPException(404, "Job not found")
+    
+    return await job_to_response(job, session)
+
+def encode_cursor(effective_date: datetime, receipt_id: UUID) -> str:
+    """Opaque position after a receipt in (effective_date, id) order."""
+    raw = f"{effective_date.isoformat()}|{receipt_id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_part, id_part = raw.split("|")
+        return datetime.fromisoformat(date_part), UUID(id_part)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
 @router.get("", response_model=list[ReceiptListItem])
 async def list_receipts(
+    response: Response,
     session: AsyncSession = Depends(get_session),
     category_id: UUID | None = None,
     year: int | None = Query(default=None),
     month: int | None = Query(default=None, ge=1, le=12),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = None,
     offset: int = 0,
 ):
-    """List receipts with optional filtering."""
-    query = select(Receipt).where(Receipt.user_id == TEMP_USER_ID)
+    """List receipts with optional filtering, newest first.
+    
+    Page with cursor: each response sets an X-Next-Cursor header (when more
+    results exist) to pass back as ?cursor=. Cursor pages cost the same at
+    any depth and don't shift when receipts are added. offset still works
+    but gets slower the deeper it goes.
+    """
+    query = receipt_list_query().where(Receipt.user_id == TEMP_USER_ID)
     
     if category_id:
         query = query.where(Receipt.category_id == category_id)
@@ -171,38 +429,180 @@ async def list_receipts(
         last_day = monthrange(year, month)[1]
         month_end = datetime(year, month, last_day, 23, 59, 59)
         query = query.where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) >= month_start
+            Receipt.effective_date >= month_start
         ).where(
-            func.coalesce(Receipt.transaction_date, Receipt.created_at) <= month_end
+            Receipt.effective_date <= month_end
         )
     
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        # The plain upper bound is implied by the OR, but it's what lets the
+        # (user_id, effective_date) index seek straight to the cursor
+        query = query.where(Receipt.effective_date <= after_date).where(
+            (Receipt.effective_date < after_date)
+            | ((Receipt.effective_date == after_date) & (Receipt.id < after_id))
+        )
+    
+    # Fetch one extra row to know whether another page exists
     query = query.order_by(
-        func.coalesce(Receipt.transaction_date, Receipt.created_at).desc()
-    ).offset(offset).limit(limit)
+        Receipt.effective_date.desc(), Receipt.id.desc()
+    ).offset(0 if cursor else offset).limit(limit + 1)
     result = await session.execute(query)
-    receipts = result.scalars().all()
+    rows = result.all()
     
-    # Load categories
-    cat_ids = [r.category_id for r in receipts if r.category_id]
-    categories = {}
-    if cat_ids:
-        cat_result = await session.execute(select(Category).where(Category.id.in_(cat_ids)))
-        categories = {c.id: c for c in cat_result.scalars().all()}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.effective_date, last.id)
     
+    return [row_to_list_item(row) for row in rows]
+
+@router.get("/search", response_model=list[ReceiptSearchHit])
+async def search_receipts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    session: AsyncSession = Depends(get_session),
+):
+    """Search receipts by merchant, payment method and line items.
+    
+    Every word must match; the last one may be partial ("starbucks cof"
+    finds Starbucks Coffee). Results are ranked by relevance, unless a word
+    is very common (search_rank_max_matches or more hits): ranking would
+    then cost too much, so the most recently added receipts come first.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    
+    dialect_name = session.bind.dialect.name
+    ranked = True
+    if dialect_name == "sqlite":
+        term_counts = (await session.execute(
+            search_term_counts_query(terms, settings.search_rank_max_matches)
+        )).one()
+        ranked = max(term_counts) < settings.search_rank_max_matches
+    
+    query = (
+        receipt_search_query(terms, dialect_name, ranked)
+        .where(Receipt.user_id == TEMP_USER_ID)
+        .limit(limit)
+    )
+    rows = (await session.execute(query)).all()
     return [
-        ReceiptListItem(
-            id=r.id,
-            merchant_name=r.merchant_name,
-            transaction_date=r.transaction_date,
-            grand_total=r.grand_total,
-            category=category_to_response(categories.get(r.category_id)),
-            expense_type=r.expense_type,
-            needs_review=r.category_confidence < settings.category_confidence_threshold,
-            created_at=r.created_at,
-        )
-        for r in receipts
+        ReceiptSearchHit(receipt=row_to_list_item(row), snippet=row.snippet)
+        for row in rows
     ]
 
+@router.get("/export")
+async def export_receipts(
+    format: Literal["csv", "ndjson"] = Query(default="csv"),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+    category_id: UUID | None = None,
+    expense_type: ExpenseType | None = None,
+):
+    """Download receipts as CSV or NDJSON, oldest first.
+    
+    start/end (YYYY-MM-DD, inclusive) filter on the receipt date. Rows are
+    streamed from a server-side cursor as they are read, so the full history
+    exports in constant memory.
+    """
+    query = receipt_export_query().where(Receipt.user_id == TEMP_USER_ID)
+    if start:
+        query = query.where(Receipt.effective_date >= datetime.combine(start, time.min))
+    if end:
+        query = query.where(Receipt.effective_date <= datetime.combine(end, time.max))
+    if category_id:
+        query = query.where(Receipt.category_id == category_id)
+    if expense_type:
+        query = query.where(Receipt.expense_type == expense_type)
+    query = query.order_by(Receipt.effective_date, Receipt.id).execution_options(
+        yield_per=settings.export_batch_size
+    )
+    
+    format_rows = export_csv_rows if format == "csv" else export_ndjson_rows
+    
+    async def body():
+        # Own session: request dependencies are closed before streaming starts
+        if format == "csv":
+            yield export_csv_header()
+        async with async_session() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield format_rows(rows)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"receipts.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/items", response_model=LineItemSpending)
+async def item_spending(
+    q: str | None = Query(default=None),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    session: AsyncSession = Depends(get_session),
+):
+    """Spending per line item across scanned receipts, biggest first.
+    
+    Lines are grouped by normalized description; q matches any part of it.
+    start/end (YYYY-MM-DD, inclusive) filter on the receipt date.
+    """
+    filters = [Receipt.user_id == TEMP_USER_ID]
+    if start:
+        filters.append(Receipt.effective_date >= datetime.combine(start, time.min))
+    if end:
+        filters.append(Receipt.effective_date <= datetime.combine(end, time.max))
+    if q:
+        key = normalize_item(q)
+        if key:
+            filters.append(LineItem.normalized_description.contains(key, autoescape=True))
+    
+    spent = func.coalesce(func.sum(LineItem.total_price), 0)
+    items_query = (
+        select(
+            LineItem.normalized_description,
+            func.min(LineItem.description),
+            func.sum(LineItem.quantity),
+            spent,
+            func.count(func.distinct(LineItem.receipt_id)),
+            func.max(Receipt.effective_date),
+        )
+        .join(Receipt, Receipt.id == LineItem.receipt_id)
+        .where(*filters)
+        .group_by(LineItem.normalized_description)
+        .order_by(spent.desc(), LineItem.normalized_description)
+        .limit(limit)
+    )
+    total_query = (
+        select(spent)
+        .select_from(LineItem)
+        .join(Receipt, Receipt.id == LineItem.receipt_id)
+        .where(*filters)
+    )
+    
+    rows = (await session.execute(items_query)).all()
+    total = (await session.execute(total_query)).scalar_one()
+    
+    return LineItemSpending(
+        total_spent=Decimal(str(total)).quantize(Decimal("0.01")),
+        items=[
+            LineItemSummary(
+                item=item,
+                description=description,
+                quantity=quantity,
+                total_spent=Decimal(str(item_total)).quantize(Decimal("0.01")),
+                receipt_count=receipt_count,
+                last_purchased=last_purchased,
+            )
+            for item, description, quantity, item_total, receipt_count, last_purchased in rows
+        ],
+    )
+
 @router.get("/{receipt_id}", response_model=ReceiptDetail)
 async def get_receipt(
     receipt_id: UUID,
@@ -232,17 +632,127 @@ async def get_receipt(
         created_at=receipt.created_at,
     )
 
+MAX_BULK_IDS = 10000
+
+@router.patch("/bulk", response_model=ReceiptBulkUpdateResponse)
+async def bulk_update_receipts(
+    request: ReceiptBulkUpdate,
+    session: AsyncSession = Depends(get_write_session),
+):
+    """Set category and/or expense type on many receipts with set-based UPDATEs.
+    
+    Select receipts by ids or by a filter (merchant substring, date range,
+    current category). A category change counts as a user override, moves
+    the receipts' spending between categories in the rollups, and is
+    remembered for their merchants.
+    """
+    if (request.ids is None) == (request.filter is None):
+        raise HTTPException(400, "Provide either ids or filter")
+    if request.category_id is None and request.expense_type is None:
+        raise HTTPException(400, "Nothing to update")
+    
+    conditions = [Receipt.user_id == TEMP_USER_ID]
+    if request.ids is not None:
+        if len(request.ids) > MAX_BULK_IDS:
+            raise HTTPException(400, f"Too many ids. Max {MAX_BULK_IDS}")
+        conditions.append(Receipt.id.in_(request.ids))
+    else:
+        criteria = request.filter
+        if criteria.merchant_contains:
+            conditions.append(func.lower(Receipt.merchant_name).contains(
+                criteria.merchant_contains.lower(), autoescape=True
+            ))
+        if criteria.start:
+            conditions.append(Receipt.effective_date >= datetime.combine(criteria.start, time.min))
+        if criteria.end:
+            conditions.append(Receipt.effective_date <= datetime.combine(criteria.end, time.max))
+        if criteria.category_id:
+            conditions.append(Receipt.category_id == criteria.category_id)
+        if len(conditions) == 1:
+            raise HTTPException(400, "Filter needs at least one condition")
+    
+    values = {}
+    if request.expense_type is not None:
+        values["expense_type"] = request.expense_type
+    if request.category_id is not None:
+        category = await session.get(Category, request.category_id)
+        if not category or category.household_id != TEMP_HOUSEHOLD_ID:
+            raise HTTPException(400, "Invalid category")
+        values["category_id"] = request.category_id
+        values["category_overridden"] = True
+    
+    # Lock the matching receipts first, in id order (Postgres; SQLite writes
+    # are serialized anyway), then work on exactly those. Otherwise a concurrent bulk edit, or
+    # a new receipt matching the filter, can commit between reading the
+    # rollup moves and the UPDATE, and the rollups drift from the receipts.
+    ids = (await session.execute(
+        select(Receipt.id).where(*conditions).order_by(Receipt.id).with_for_update()
+    )).scalars().all()
+    
+    updated = 0
+    merchant_names = set()
+    for start in range(0, len(ids), MAX_BULK_IDS):
+        in_chunk = Receipt.id.in_(ids[start:start + MAX_BULK_IDS])
+        
+        if request.category_id is not None:
+            # Spending that moves to the new category, per day and old category
+            moving = (Receipt.category_id == None) | (Receipt.category_id != request.category_id)
+            day = day_sql(Receipt.effective_date, session.bind.dialect.name)
+            moved = await session.execute(
+                select(
+                    Receipt.household_id, day, Receipt.category_id,
+                    func.sum(Receipt.grand_total), func.count(),
+                )
+                .where(in_chunk, moving, Receipt.household_id != None)
+                .group_by(Receipt.household_id, day, Receipt.category_id)
+            )
+            rollup_changes = []
+            for household_id, receipt_day, old_category_id, total, count in moved.all():
+                total = Decimal(str(total))
+                if old_category_id is not None:
+                    rollup_changes.append(
+                        ((household_id, TEMP_USER_ID, receipt_day, old_category_id, -total), -count)
+                    )
+                rollup_changes.append(
+                    ((household_id, TEMP_USER_ID, receipt_day, request.category_id, total), count)
+                )
+            await apply_rollups(session, rollup_changes)
+            
+            merchants = await session.execute(
+                select(Receipt.merchant_name).where(in_chunk, moving).distinct()
+            )
+            merchant_names.update(merchants.scalars().all())
+        
+        result = await session.execute(
+            update(Receipt)
+            .where(in_chunk)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    
+    if merchant_names:
+        await remember_merchant_categories(
+            session, TEMP_HOUSEHOLD_ID, list(merchant_names), request.category_id
+        )
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
+    await session.commit()
+    
+    return ReceiptBulkUpdateResponse(updated=updated)
+
 @router.patch("/{receipt_id}", response_model=ReceiptDetail)
 async def update_receipt(
     receipt_id: UUID,
     update: ReceiptUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Update receipt category or other fields."""
     receipt = await session.get(Receipt, receipt_id)
     if not receipt or receipt.user_id != TEMP_USER_ID:
         raise HTTPException(404, "Receipt not found")
     
+    rollup_before = rollup_entry(receipt)
+    
     if update.category_id is not None:
         category = await session.get(Category, update.category_id)
         if not category or category.household_id != TEMP_HOUSEHOLD_ID:
@@ -258,6 +768,15 @@ async def update_receipt(
     if update.transaction_date is not None:
         receipt.transaction_date = update.transaction_date
     
+    await apply_rollup_change(session, rollup_before, rollup_entry(receipt))
+    
+    # Teach future receipts from this merchant the corrected category
+    if update.category_id is not None:
+        await remember_merchant_category(
+            session, TEMP_HOUSEHOLD_ID, receipt.merchant_name, receipt.category_id
+        )
+    
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     await session.refresh(receipt)
     
@@ -283,14 +802,21 @@ async def update_receipt(
 @router.delete("/{receipt_id}")
 async def delete_receipt(
     receipt_id: UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Delete a receipt."""
     receipt = await session.get(Receipt, receipt_id)
     if not receipt or receipt.user_id != TEMP_USER_ID:
         raise HTTPException(404, "Receipt not found")
     
+    await apply_rollup(session, rollup_entry(receipt), -1)
+    await session.execute(delete(LineItem).where(LineItem.receipt_id == receipt.id))
+    # The job that produced it keeps its history, minus the link
+    await session.execute(
+        update(ReceiptJob).where(ReceiptJob.receipt_id == receipt.id).values(receipt_id=None)
+    )
     await session.delete(receipt)
+    await mark_dashboards_stale(session, TEMP_HOUSEHOLD_ID)
     await session.commit()
     
     return {"deleted": True}
\ No newline at end of file
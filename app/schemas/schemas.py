@@ -1,8 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from uuid import UUID
 from pydantic import BaseModel
-from app.models.models import ExpenseType
+from app.models.models import ExpenseType, JobStatus
 
 # ============================================================
 # CATEGORY SCHEMAS
@@ -29,10 +29,27 @@ class CategoryUpdate(BaseModel):
     is_active: bool | None = None
     sort_order: int | None = None
 
+class MerchantRuleCreate(BaseModel):
+    pattern: str
+    category_id: UUID
+    confidence: float = 0.95
+
+class MerchantRuleResponse(BaseModel):
+    id: UUID
+    pattern: str
+    category: CategoryResponse
+    confidence: float
+
 # ============================================================
 # RECEIPT SCHEMAS
 # ============================================================
 
+class ImageStats(BaseModel):
+    original_bytes: int
+    optimized_bytes: int  # What was sent to the vision API
+    preprocess_ms: float
+    extract_ms: float
+
 class ReceiptUploadResponse(BaseModel):
     id: UUID
     merchant_name: str | None
@@ -42,6 +59,37 @@ class ReceiptUploadResponse(BaseModel):
     category_confidence: float
     needs_review: bool
     image_url: str
+    # Set on the upload response itself, not on job results
+    extraction_cached: bool | None = None
+    image_stats: ImageStats | None = None  # None when the extraction was cached
+
+class BatchUploadItem(BaseModel):
+    filename: str | None
+    receipt: ReceiptUploadResponse | None
+    error: str | None
+    job: "ReceiptJobResponse | None" = None  # Queued because the Claude API was unavailable
+
+class BatchUploadResponse(BaseModel):
+    succeeded: int
+    failed: int
+    queued: int = 0
+    results: list[BatchUploadItem]
+
+class StatementImportResponse(BaseModel):
+    imported: int
+    duplicates: int
+    skipped: int  # Credits, payments and unreadable rows
+    claude_calls: int
+    categorized: dict[str, int]  # Imported rows by method: learned, rules, claude, uncategorized
+
+class ReceiptJobResponse(BaseModel):
+    id: UUID
+    status: JobStatus
+    attempts: int
+    error: str | None
+    receipt: ReceiptUploadResponse | None
+    created_at: datetime
+    updated_at: datetime
 
 class ReceiptDetail(BaseModel):
     id: UUID
@@ -66,6 +114,34 @@ class ReceiptUpdate(BaseModel):
     grand_total: Decimal | None = None
     transaction_date: datetime | None = None
 
+class ReceiptBulkFilter(BaseModel):
+    merchant_contains: str | None = None  # Case-insensitive
+    start: date | None = None  # Receipt date, inclusive
+    end: date | None = None
+    category_id: UUID | None = None  # Current category
+
+class ReceiptBulkUpdate(BaseModel):
+    # Exactly one of ids / filter selects the receipts
+    ids: list[UUID] | None = None
+    filter: ReceiptBulkFilter | None = None
+    category_id: UUID | None = None
+    expense_type: ExpenseType | None = None
+
+class ReceiptBulkUpdateResponse(BaseModel):
+    updated: int
+
+class LineItemSummary(BaseModel):
+    item: str  # Normalized description the lines are grouped by
+    description: str  # One of the descriptions as printed
+    quantity: Decimal | None
+    total_spent: Decimal
+    receipt_count: int
+    last_purchased: datetime
+
+class LineItemSpending(BaseModel):
+    total_spent: Decimal
+    items: list[LineItemSummary]
+
 class ManualEntryRequest(BaseModel):
     merchant_name: str
     grand_total: Decimal
@@ -83,6 +159,10 @@ class ReceiptListItem(BaseModel):
     needs_review: bool
     created_at: datetime
 
+class ReceiptSearchHit(BaseModel):
+    receipt: ReceiptListItem
+    snippet: str | None  # Matched text with <mark> highlights (SQLite only)
+
 # ============================================================
 # BUDGET SCHEMAS
 # ============================================================
@@ -102,6 +182,43 @@ class BudgetDashboard(BaseModel):
     by_category: list[BudgetCategorySummary]
     recent_receipts: list[ReceiptListItem]
 
+class BudgetTrendCategory(BaseModel):
+    category_id: UUID
+    monthly_limit: Decimal
+    spent: Decimal
+
+class BudgetTrendMonth(BaseModel):
+    month: str
+    total_budget: Decimal
+    total_spent: Decimal
+    by_category: list[BudgetTrendCategory]
+
+class BudgetTrends(BaseModel):
+    from_month: str
+    to_month: str
+    categories: list[CategoryResponse]
+    months: list[BudgetTrendMonth]
+
+class BudgetDailyCategory(BaseModel):
+    category_id: UUID
+    monthly_limit: Decimal
+    spent: Decimal
+    cumulative: list[Decimal]  # Running total at the end of each day of the month
+    projected_month_end: Decimal
+    projected_over_on: int | None  # Day of month the limit is (or will be) passed
+
+class BudgetDailyMonth(BaseModel):
+    month: str
+    days_in_month: int
+    days_elapsed: int
+    by_category: list[BudgetDailyCategory]
+
+class BudgetDaily(BaseModel):
+    from_month: str
+    to_month: str
+    categories: list[CategoryResponse]
+    months: list[BudgetDailyMonth]
+
 class BudgetSetRequest(BaseModel):
     category_id: UUID
     monthly_limit: Decimal
@@ -0,0 +1,231 @@
+import anthropic
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ClaudeUnavailableError(Exception):
+    """The API is degraded: the circuit breaker is open or retries ran out."""
+
+
+class TokenBucket:
+    """Client-side request rate limit: per_minute tokens a minute, up to capacity saved up."""
+
+    def __init__(self, per_minute: int, capacity: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # Waiters queue on the lock, so tokens go out first come, first served
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. for a 429's Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> bool:
+        """Take a token, waiting for one if needed. Returns True if it had to wait."""
+        if self.rate <= 0:
+            return False
+        waited = False
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+                waited = True
+                await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops calls after threshold consecutive failures.
+
+    Once reset_seconds have passed one trial call is let through (half-open);
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial_started: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if self.retry_in() > 0 else "half_open"
+
+    def retry_in(self) -> float:
+        """Seconds until a call could be let through; 0 if one can go now."""
+        if self._opened_at is None:
+            return 0.0
+        # A trial call that never reported back (cancelled) stops blocking after reset_seconds
+        since = self._trial_started if self._trial_started is not None else self._opened_at
+        return max(0.0, since + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self.retry_in() > 0:
+            return False
+        self._trial_started = time.monotonic()
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._trial_started = None
+
+    def record_failure(self) -> bool:
+        """Count a failed call. Returns True if this opened the breaker."""
+        self.failures += 1
+        trial_failed = self._trial_started is not None
+        if trial_failed or (self._opened_at is None and self.failures >= self.threshold):
+            self._opened_at = time.monotonic()
+            self._trial_started = None
+            return True
+        return False
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, anthropic.APIConnectionError):  # Includes timeouts
+        return True
+    return isinstance(error, anthropic.APIStatusError) and (
+        error.status_code == 429 or error.status_code >= 500
+    )
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds the API asked us to wait, from retry-after-ms or retry-after."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClaudeClient:
+    """The process's Messages API client, shared by every Claude call.
+
+    Requests go through a token bucket sized to our rate limit and a
+    concurrency cap. 429s, 5xx/529s and timeouts are retried with jittered
+    exponential backoff (or the server's Retry-After), and a circuit breaker
+    fails calls fast while the API keeps failing. Either way the caller gets
+    ClaudeUnavailableError and can defer the work.
+    """
+
+    def __init__(self):
+        # The SDK's own retries are off; they'd bypass the bucket and breaker
+        self.client = anthropic.AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            max_retries=0,
+            timeout=settings.claude_timeout_seconds,
+        )
+        # Caps in-flight requests so a burst of uploads can't exhaust the pool
+        self.semaphore = asyncio.Semaphore(settings.claude_max_concurrency)
+        self.bucket = TokenBucket(settings.claude_requests_per_minute, settings.claude_burst)
+        self.breaker = CircuitBreaker(
+            settings.claude_breaker_threshold, settings.claude_breaker_reset_seconds
+        )
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,  # Waited on the token bucket
+            "rate_limited": 0,  # 429 responses
+            "overloaded": 0,  # 529 responses
+            "server_errors": 0,
+            "timeouts": 0,  # Timeouts and connection errors
+            "retries": 0,
+            "breaker_trips": 0,
+            "rejected": 0,  # Failed fast by the open breaker
+        }
+
+    def metrics(self) -> dict:
+        return {**self.stats, "breaker": self.breaker.state}
+
+    def _count_error(self, error: Exception):
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            self.stats["rate_limited"] += 1
+        elif status == 529:
+            self.stats["overloaded"] += 1
+        elif status is not None:
+            self.stats["server_errors"] += 1
+        else:
+            self.stats["timeouts"] += 1
+
+    async def create_message(self, **kwargs):
+        """Send a Messages API request, retrying transient failures."""
+        for attempt in range(settings.claude_max_retries + 1):
+            if not self.breaker.allow():
+                self.stats["rejected"] += 1
+                raise ClaudeUnavailableError(
+                    f"Claude API unavailable, retry in {self.breaker.retry_in():.0f}s"
+                )
+            if await self.bucket.acquire():
+                self.stats["throttled"] += 1
+
+            try:
+                async with self.semaphore:
+                    self.stats["requests"] += 1
+                    response = await self.client.messages.create(**kwargs)
+            except Exception as e:
+                if not _retryable(e):
+                    if isinstance(e, anthropic.APIStatusError):
+                        self.breaker.record_success()  # It answered; the request was bad
+                    raise
+                self._count_error(e)
+                if self.breaker.record_failure():
+                    self.stats["breaker_trips"] += 1
+                    logger.warning("Claude circuit breaker opened after %d failures", self.breaker.failures)
+
+                retry_after = _retry_after(e)
+                if retry_after is not None and getattr(e, "status_code", None) == 429:
+                    self.bucket.pause(retry_after)
+                if attempt == settings.claude_max_retries or (
+                    retry_after is not None and retry_after > settings.claude_retry_max_seconds
+                ):
+                    raise ClaudeUnavailableError(f"Claude API request failed: {e}") from e
+
+                # Full jitter, so callers that failed together don't retry together
+                backoff = min(
+                    settings.claude_retry_max_seconds,
+                    settings.claude_retry_base_seconds * 2 ** attempt,
+                )
+                delay = max(random.uniform(0, backoff), retry_after or 0)
+                self.stats["retries"] += 1
+                logger.info("Retrying Claude request in %.1fs after %s", delay, type(e).__name__)
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
+
+
+claude_client = ClaudeClient()
@@ -0,0 +1,84 @@
+import hashlib
+from collections import OrderedDict
+from uuid import UUID
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from app.config import settings
+from app.models.models import Household
+
+
+class DashboardCache:
+    """LRU of rendered budget dashboards keyed by (household, month).
+    
+    Entries are tagged with the household's dashboard_version, which every
+    write that can change a dashboard bumps in its own transaction (see
+    mark_dashboards_stale). Readers pass the current version and an entry
+    from an older one is a miss, so changes made by other workers or by the
+    CLI are picked up as soon as they commit.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[UUID, str], tuple[int, str, bytes]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+    
+    def get(self, household_id: UUID, month: str, version: int) -> tuple[str, bytes] | None:
+        """Cached (etag, body) rendered at this version, if present."""
+        key = (household_id, month)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] != version:
+            del self._entries[key]
+            self.stats["stale"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1], entry[2]
+    
+    def put(self, household_id: UUID, month: str, body: bytes, version: int) -> str:
+        """Store a dashboard rendered from data at least as new as version; return its ETag.
+        
+        Read the version before the data it tags: a write that lands in
+        between only makes the entry look older than it is.
+        """
+        etag = make_etag(body)
+        self._entries[(household_id, month)] = (version, etag, body)
+        self._entries.move_to_end((household_id, month))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag
+
+
+async def dashboard_version(session: AsyncSession, household_id: UUID) -> int:
+    result = await session.execute(
+        select(Household.dashboard_version).where(Household.id == household_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def mark_dashboards_stale(session: AsyncSession, household_id: UUID | None = None):
+    """Bump the dashboard version of one household, or all of them. Caller commits."""
+    statement = update(Household).values(
+        dashboard_version=func.coalesce(Household.dashboard_version, 0) + 1
+    )
+    if household_id is not None:
+        statement = statement.where(Household.id == household_id)
+    await session.execute(statement)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+dashboard_cache = DashboardCache(max_entries=settings.dashboard_cache_max_entries)
@@ -0,0 +1,70 @@
+import sqlalchemy as sa
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+from app.database import backfill_derived_columns, create_schema, rebuild_search_index
+
+
+class TargetNotEmptyError(Exception):
+    pass
+
+
+def _source_columns(conn) -> dict[str, set[str]]:
+    inspector = sa.inspect(conn)
+    return {
+        name: {c["name"] for c in inspector.get_columns(name)}
+        for name in inspector.get_table_names()
+    }
+
+
+def sqlite_source_url(source: str) -> str:
+    """Accept either a SQLAlchemy URL or a path to a SQLite file."""
+    if "://" in source:
+        return source
+    return f"sqlite+aiosqlite:///{source}"
+
+
+async def copy_database(
+    source: AsyncEngine,
+    target: AsyncEngine,
+    chunk_size: int = 1000,
+) -> dict[str, int]:
+    """Bulk-copy every table from source into an empty target database.
+
+    Tables are copied parents-first so foreign keys hold, rows are streamed
+    from the source and inserted chunk_size at a time, and the whole copy is
+    one transaction on the target. Returns rows copied per table.
+
+    The source is only read, never upgraded. A source written by an older
+    version copies the tables and columns it has; columns added since are
+    left NULL and then backfilled on the target, as create_schema would.
+    """
+    await create_schema(target)
+    tables = SQLModel.metadata.sorted_tables
+
+    copied = {}
+    async with source.connect() as src, target.begin() as dst:
+        source_columns = await src.run_sync(_source_columns)
+        for table in tables:
+            existing = (await dst.execute(select(func.count()).select_from(table))).scalar_one()
+            if existing:
+                raise TargetNotEmptyError(f"Target table {table.name} already has {existing} rows")
+
+        for table in tables:
+            copied[table.name] = 0
+            if table.name not in source_columns:
+                continue
+            columns = [c for c in table.columns if c.name in source_columns[table.name]]
+            result = await src.stream(
+                select(*columns).execution_options(yield_per=chunk_size)
+            )
+            async for rows in result.partitions(chunk_size):
+                await dst.execute(insert(table), [dict(row._mapping) for row in rows])
+                copied[table.name] += len(rows)
+
+        await dst.run_sync(backfill_derived_columns)
+        # The search index's insert trigger skips statement imports
+        await dst.run_sync(rebuild_search_index)
+
+    return copied
@@ -0,0 +1,106 @@
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from app.config import settings
+from app.database import async_write_session
+from app.models.models import ExtractionCacheEntry
+
+# Process-wide counters, exposed via /metrics
+stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def hash_image(image_bytes: bytes) -> str:
+    """Cache key for an uploaded image."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _expiry_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(days=settings.extraction_cache_max_age_days)
+
+
+async def get_cached_extraction(image_hash: str) -> ExtractionCacheEntry | None:
+    """Return the cache entry for this image, if still fresh."""
+    if not settings.extraction_cache_enabled:
+        return None
+    
+    async with async_write_session() as session:
+        entry = await session.get(ExtractionCacheEntry, image_hash)
+        if entry is None or entry.created_at < _expiry_cutoff():
+            stats["misses"] += 1
+            return None
+        
+        entry.last_used_at = datetime.utcnow()
+        await session.commit()
+        stats["hits"] += 1
+        return entry
+
+
+async def store_extraction(image_hash: str, extraction: dict):
+    """Save an extraction result and evict expired / least recently used entries."""
+    if not settings.extraction_cache_enabled:
+        return
+    
+    async with async_write_session() as session:
+        try:
+            entry = await session.get(ExtractionCacheEntry, image_hash)
+            if entry is None:
+                session.add(ExtractionCacheEntry(image_hash=image_hash, extraction=extraction))
+            else:
+                # Re-extracted after expiry; the cached category still applies
+                entry.extraction = extraction
+                entry.created_at = entry.last_used_at = datetime.utcnow()
+            await session.flush()
+        except IntegrityError:
+            # A concurrent upload of the same image stored it first
+            await session.rollback()
+            return
+        stats["stores"] += 1
+        
+        expired = await session.execute(
+            delete(ExtractionCacheEntry)
+            .where(ExtractionCacheEntry.created_at < _expiry_cutoff())
+        )
+        evicted = expired.rowcount or 0
+        
+        count = (await session.execute(
+            select(func.count()).select_from(ExtractionCacheEntry)
+        )).scalar_one()
+        if count > settings.extraction_cache_max_entries:
+            overflow = (
+                select(ExtractionCacheEntry.image_hash)
+                .order_by(ExtractionCacheEntry.last_used_at.desc())
+                .offset(settings.extraction_cache_max_entries)
+            )
+            trimmed = await session.execute(
+                delete(ExtractionCacheEntry)
+                .where(ExtractionCacheEntry.image_hash.in_(overflow))
+            )
+            evicted += trimmed.rowcount or 0
+        
+        stats["evictions"] += evicted
+        await session.commit()
+
+
+async def store_category(image_hash: str, slug: str, confidence: float):
+    """Remember the Claude categorization made for a cached image."""
+    if not settings.extraction_cache_enabled:
+        return
+    
+    async with async_write_session() as session:
+        entry = await session.get(ExtractionCacheEntry, image_hash)
+        if entry is None:
+            return
+        entry.category_slug = slug
+        entry.category_confidence = confidence
+        await session.commit()
+
+
+def cache_stats() -> dict:
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
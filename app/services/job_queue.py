@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.config import settings
+from app.database import async_session, async_write_session
+from app.models.models import ReceiptJob, JobStatus
+from app.services.claude_client import ClaudeUnavailableError, claude_client
+from app.services.dashboard_cache import mark_dashboards_stale
+from app.services.line_items import receipt_line_items
+from app.services.receipt_processor import (
+    process_receipt, load_category_options, build_receipt
+)
+from app.services.rollups import apply_rollup, rollup_entry
+from app.services.storage import receipt_image_path
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptJobQueue:
+    """Background worker pool draining the persistent ReceiptJob table.
+
+    Jobs live in the database, so anything still pending (or interrupted
+    mid-processing) when the server stops is picked up again on start.
+    Jobs that hit a Claude outage go back to pending without using up an
+    attempt, and workers wait while the circuit breaker is open.
+    """
+
+    def __init__(self, worker_count: int, poll_seconds: float):
+        self.worker_count = worker_count
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self):
+        await self._requeue_interrupted()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(), name=f"receipt-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        self.notify()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def notify(self):
+        """Wake idle workers after a job was added."""
+        self._wakeup.set()
+
+    async def enqueue(
+        self,
+        *,
+        user_id: UUID,
+        household_id: UUID | None,
+        image_path: str,
+        media_type: str,
+    ) -> ReceiptJob:
+        job = ReceiptJob(
+            user_id=user_id,
+            household_id=household_id,
+            image_path=image_path,
+            media_type=media_type,
+        )
+        async with async_write_session() as session:
+            session.add(job)
+            await session.commit()
+        self.notify()
+        return job
+
+    async def _requeue_interrupted(self):
+        """Jobs left PROCESSING by a previous run go back to PENDING."""
+        async with async_write_session() as session:
+            await session.execute(
+                update(ReceiptJob)
+                .where(ReceiptJob.status == JobStatus.PROCESSING)
+                .values(status=JobStatus.PENDING, updated_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def _worker_loop(self):
+        while True:
+            self._wakeup.clear()
+            # No point claiming jobs the open breaker would reject
+            pause = claude_client.breaker.retry_in()
+            if pause:
+                await asyncio.sleep(pause)
+            try:
+                job_id = await self._claim_next()
+            except Exception:
+                logger.exception("Failed to claim receipt job")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # Saving the result failed; don't leave the job PROCESSING
+                logger.exception("Receipt job %s failed while saving", job_id)
+                try:
+                    await self._release(job_id, str(e))
+                except Exception:
+                    logger.exception("Failed to release receipt job %s", job_id)
+
+    async def _release(self, job_id: UUID, error: str):
+        """Put a job back to PENDING, or FAILED once it is out of attempts."""
+        async with async_write_session() as session:
+            job = await session.get(ReceiptJob, job_id)
+            retry = job.attempts < settings.receipt_job_max_attempts
+            job.status = JobStatus.PENDING if retry else JobStatus.FAILED
+            job.error = error
+            job.updated_at = datetime.utcnow()
+            await session.commit()
+        if retry:
+            self.notify()
+
+    async def _claim_next(self) -> UUID | None:
+        """Atomically move the oldest pending job to PROCESSING."""
+        async with async_write_session() as session:
+            while True:
+                result = await session.execute(
+                    select(ReceiptJob.id)
+                    .where(ReceiptJob.status == JobStatus.PENDING)
+                    .order_by(ReceiptJob.created_at)
+                    .limit(1)
+                )
+                job_id = result.scalar_one_or_none()
+                if job_id is None:
+                    return None
+
+                claimed = await session.execute(
+                    update(ReceiptJob)
+                    .where(ReceiptJob.id == job_id)
+                    .where(ReceiptJob.status == JobStatus.PENDING)
+                    .values(
+                        status=JobStatus.PROCESSING,
+                        attempts=ReceiptJob.attempts + 1,
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+                await session.commit()
+                if claimed.rowcount:
+                    return job_id
+                # Another worker got there first; try the next one
+
+    async def _run(self, job_id: UUID):
+        # Read and call Claude outside the write session so other writers
+        # aren't held up for the length of an API round-trip
+        receipt = None
+        error = None
+        deferred = False
+        async with async_session() as session:
+            job = await session.get(ReceiptJob, job_id)
+            try:
+                categories = await load_category_options(session, job.household_id)
+                await session.commit()
+                result = await process_receipt(
+                    receipt_image_path(job.image_path),
+                    job.media_type,
+                    categories,
+                    household_id=job.household_id,
+                )
+                receipt = build_receipt(result, job.image_path, job.user_id, job.household_id)
+            except ClaudeUnavailableError as e:
+                logger.warning("Receipt job %s deferred: %s", job_id, e)
+                error = str(e)
+                deferred = True
+            except Exception as e:
+                logger.exception("Receipt job %s failed", job_id)
+                error = str(e)
+
+        async with async_write_session() as session:
+            job = await session.get(ReceiptJob, job_id)
+            if receipt is not None:
+                session.add(receipt)
+                session.add_all(receipt_line_items(receipt))
+                await apply_rollup(session, rollup_entry(receipt))
+                if job.household_id:
+                    await mark_dashboards_stale(session, job.household_id)
+                job.receipt_id = receipt.id
+                job.status = JobStatus.COMPLETED
+                job.error = None
+            elif deferred:
+                # The outage isn't the job's fault; don't count the attempt
+                job.attempts -= 1
+                job.status = JobStatus.PENDING
+                job.error = error
+            else:
+                retry = job.attempts < settings.receipt_job_max_attempts
+                job.status = JobStatus.PENDING if retry else JobStatus.FAILED
+                job.error = error
+
+            job.updated_at = datetime.utcnow()
+            await session.commit()
+            
+            if job.status == JobStatus.PENDING:
+                self.notify()
+
+
+job_queue = ReceiptJobQueue(
+    worker_count=settings.receipt_worker_count,
+    poll_seconds=settings.receipt_job_poll_seconds,
+)
@@ -0,0 +1,83 @@
+import re
+from decimal import Decimal, InvalidOperation
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models.models import LineItem, Receipt
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_item(description: str | None) -> str | None:
+    """Grouping key for an item: "Pampers Diapers, Sz-3!" -> "pampers diapers sz 3"."""
+    if not description:
+        return None
+    key = _NON_WORD.sub(" ", description.lower())
+    key = " ".join(key.split())
+    return key or None
+
+
+def _decimal(value, places: str) -> Decimal | None:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal(places))
+    except InvalidOperation:
+        return None
+
+
+def build_line_items(receipt_id: UUID, items: list | None) -> list[LineItem]:
+    """LineItem rows for an extraction's line_items; entries without a description are skipped."""
+    line_items = []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict):
+            continue
+        description = str(item.get("description") or "").strip()
+        normalized = normalize_item(description)
+        if not normalized:
+            continue
+        line_items.append(LineItem(
+            receipt_id=receipt_id,
+            position=position,
+            description=description,
+            normalized_description=normalized,
+            quantity=_decimal(item.get("quantity"), "0.001"),
+            total_price=_decimal(item.get("total_price"), "0.01"),
+        ))
+    return line_items
+
+
+async def backfill_line_items(session: AsyncSession, batch_size: int = 500) -> int:
+    """Create LineItem rows from raw_extraction for scanned receipts that have none.
+
+    Walks the receipts in id order a batch at a time. Caller commits.
+    """
+    has_items = select(LineItem.receipt_id)
+    created = 0
+    last_id = None
+    while True:
+        query = (
+            select(Receipt.id, Receipt.raw_extraction)
+            .where(Receipt.image_path != None)
+            .where(Receipt.id.not_in(has_items))
+            .order_by(Receipt.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.where(Receipt.id > last_id)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            return created
+
+        for receipt_id, raw_extraction in rows:
+            items = build_line_items(receipt_id, (raw_extraction or {}).get("line_items"))
+            session.add_all(items)
+            created += len(items)
+        await session.flush()
+        last_id = rows[-1][0]
+
+
+def receipt_line_items(receipt: Receipt) -> list[LineItem]:
+    """LineItem rows for a scanned receipt, from its raw_extraction."""
+    return build_line_items(receipt.id, (receipt.raw_extraction or {}).get("line_items"))
@@ -0,0 +1,179 @@
+from collections import deque
+from uuid import UUID
+from sqlmodel import select
+
+from app.database import async_session
+from app.models.models import Category, MerchantRule
+
+# Rule layers, higher wins when the same pattern is defined twice
+BUILTIN_PRIORITY = 0
+GLOBAL_PRIORITY = 1
+HOUSEHOLD_PRIORITY = 2
+
+
+class MerchantMatcher:
+    """Aho-Corasick automaton over merchant name patterns.
+
+    Every pattern found anywhere in the merchant name is a candidate; the
+    longest one wins, then the highest confidence, then the pattern itself,
+    so the result never depends on insertion order.
+
+    Adding a pattern extends the trie in place and only marks the failure
+    links stale (they are recomputed on the next match). Removing one just
+    drops its definition; the trie nodes stay behind as harmless dead ends.
+    """
+
+    def __init__(self, rules: dict[str, tuple[str, float]] | None = None):
+        self._goto: list[dict[str, int]] = [{}]
+        self._terminal: list[str | None] = [None]
+        self._fail: list[int] = [0]
+        self._output_link: list[int] = [0]
+        self._links_stale = False
+        # pattern -> {priority: (slug, confidence)}
+        self._rules: dict[str, dict[int, tuple[str, float]]] = {}
+
+        for pattern, (slug, confidence) in (rules or {}).items():
+            self.add(pattern, slug, confidence)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add(self, pattern: str, slug: str, confidence: float, priority: int = BUILTIN_PRIORITY):
+        pattern = pattern.strip().lower()
+        if not pattern:
+            return
+
+        self._rules.setdefault(pattern, {})[priority] = (slug, confidence)
+
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._terminal.append(None)
+                self._fail.append(0)
+                self._output_link.append(0)
+                self._goto[node][ch] = next_node
+                self._links_stale = True
+            node = next_node
+
+        if self._terminal[node] is None:
+            self._terminal[node] = pattern
+            self._links_stale = True
+
+    def remove(self, pattern: str, priority: int = BUILTIN_PRIORITY):
+        pattern = pattern.strip().lower()
+        layers = self._rules.get(pattern)
+        if not layers:
+            return
+        layers.pop(priority, None)
+        if not layers:
+            del self._rules[pattern]
+
+    def _build_links(self):
+        """Breadth-first pass computing failure and output links."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output_link[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(ch, 0)
+                self._fail[child] = fail
+                self._output_link[child] = fail if self._terminal[fail] else self._output_link[fail]
+                queue.append(child)
+
+        self._links_stale = False
+
+    def match(self, text: str | None) -> tuple[str, str, float] | None:
+        """Best (pattern, slug, confidence) found in text, or None."""
+        if not text or not self._rules:
+            return None
+        if self._links_stale:
+            self._build_links()
+
+        goto, fail, terminal, output_link = self._goto, self._fail, self._terminal, self._output_link
+        best_key = None
+        best = None
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            out = node if terminal[node] else output_link[node]
+            while out:
+                pattern = terminal[out]
+                layers = self._rules.get(pattern)
+                if layers:
+                    slug, confidence = layers[max(layers)]
+                    key = (len(pattern), confidence, pattern)
+                    if best_key is None or key > best_key:
+                        best_key = key
+                        best = (pattern, slug, confidence)
+                out = output_link[out]
+
+        return best
+
+
+class MatcherRegistry:
+    """Per-household matchers: built-in rules plus MerchantRule rows."""
+
+    def __init__(self, builtin_rules: dict[str, tuple[str, float]]):
+        self.builtin_rules = builtin_rules
+        self.default = MerchantMatcher(builtin_rules)
+        self._by_household: dict[UUID, MerchantMatcher] = {}
+
+    async def for_household(self, household_id: UUID | None) -> MerchantMatcher:
+        if household_id is None:
+            return self.default
+
+        matcher = self._by_household.get(household_id)
+        if matcher is None:
+            matcher = await self._load(household_id)
+            self._by_household[household_id] = matcher
+        return matcher
+
+    async def _load(self, household_id: UUID) -> MerchantMatcher:
+        matcher = MerchantMatcher(self.builtin_rules)
+        async with async_session() as session:
+            result = await session.execute(
+                select(MerchantRule, Category.slug)
+                .join(Category, Category.id == MerchantRule.category_id)
+                .where(
+                    (MerchantRule.household_id == household_id)
+                    | (MerchantRule.household_id == None)
+                )
+            )
+            for rule, slug in result.all():
+                matcher.add(rule.pattern, slug, rule.confidence, rule_priority(rule))
+        return matcher
+
+    def _affected(self, rule: MerchantRule) -> list[MerchantMatcher]:
+        if rule.household_id is None:
+            return list(self._by_household.values())
+        matcher = self._by_household.get(rule.household_id)
+        return [matcher] if matcher else []
+
+    def rule_added(self, rule: MerchantRule, slug: str):
+        for matcher in self._affected(rule):
+            matcher.add(rule.pattern, slug, rule.confidence, rule_priority(rule))
+
+    def rule_removed(self, rule: MerchantRule):
+        for matcher in self._affected(rule):
+            matcher.remove(rule.pattern, rule_priority(rule))
+
+    def invalidate(self, household_id: UUID):
+        """Drop a household's matcher so it is reloaded on next use."""
+        self._by_household.pop(household_id, None)
+
+
+def rule_priority(rule: MerchantRule) -> int:
+    return GLOBAL_PRIORITY if rule.household_id is None else HOUSEHOLD_PRIORITY
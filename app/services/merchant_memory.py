@@ -0,0 +1,145 @@
+import re
+from datetime import datetime
+from uuid import UUID, uuid4
+from sqlalchemy import case
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models.models import MerchantCategory
+
+_STORE_NUMBER = re.compile(r"#\s*\w+|\b\d{3,}\b")
+_NON_WORD = re.compile(r"[^a-z0-9&' ]+")
+
+
+def normalize_merchant(merchant_name: str | None) -> str | None:
+    """Stable lookup key for a merchant: "STARBUCKS #1234" -> "starbucks"."""
+    if not merchant_name:
+        return None
+    
+    key = _STORE_NUMBER.sub(" ", merchant_name.lower())
+    key = _NON_WORD.sub(" ", key).replace("'", "")
+    key = " ".join(key.split())
+    return key or None
+
+
+async def lookup_merchant_category(household_id: UUID, merchant_name: str | None) -> UUID | None:
+    """Category the household last assigned to this merchant, if any."""
+    merchant_key = normalize_merchant(merchant_name)
+    if not merchant_key:
+        return None
+    
+    async with async_session() as session:
+        result = await session.execute(
+            select(MerchantCategory.category_id)
+            .where(MerchantCategory.household_id == household_id)
+            .where(MerchantCategory.merchant_key == merchant_key)
+        )
+        return result.scalar_one_or_none()
+
+
+async def lookup_merchant_categories(
+    household_id: UUID,
+    merchant_names: list[str],
+) -> dict[str, UUID]:
+    """Bulk lookup_merchant_category: merchant_key -> category_id for known keys."""
+    merchant_keys = {normalize_merchant(name) for name in merchant_names} - {None}
+    if not merchant_keys:
+        return {}
+    
+    async with async_session() as session:
+        result = await session.execute(
+            select(MerchantCategory.merchant_key, MerchantCategory.category_id)
+            .where(MerchantCategory.household_id == household_id)
+            .where(MerchantCategory.merchant_key.in_(merchant_keys))
+        )
+        return dict(result.all())
+
+
+async def remember_merchant_category(
+    session: AsyncSession,
+    household_id: UUID,
+    merchant_name: str | None,
+    category_id: UUID,
+):
+    """Record a user-confirmed category for a merchant. Caller commits."""
+    await remember_merchant_categories(session, household_id, [merchant_name], category_id)
+
+
+async def remember_merchant_categories(
+    session: AsyncSession,
+    household_id: UUID,
+    merchant_names: list[str | None],
+    category_id: UUID,
+):
+    """Bulk remember_merchant_category, one confirmation per merchant key. Caller commits.
+    
+    Written as one upsert, so concurrent confirmations of a new merchant
+    can't both insert it.
+    """
+    merchant_keys = {normalize_merchant(name) for name in merchant_names} - {None}
+    if not merchant_keys:
+        return
+    
+    dialect_name = session.bind.dialect.name
+    if dialect_name not in ("sqlite", "postgresql"):
+        await _remember_merchant_keys(session, household_id, merchant_keys, category_id)
+        return
+    
+    now = datetime.utcnow()
+    dialect_insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+    stmt = dialect_insert(MerchantCategory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["household_id", "merchant_key"],
+        set_={
+            "times_confirmed": case(
+                (MerchantCategory.category_id == stmt.excluded.category_id,
+                 MerchantCategory.times_confirmed + 1),
+                else_=1,
+            ),
+            "category_id": stmt.excluded.category_id,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    # Sorted, so concurrent writers lock mapping rows in the same order
+    await session.execute(stmt, [
+        {
+            "id": uuid4(),
+            "household_id": household_id,
+            "merchant_key": key,
+            "category_id": category_id,
+            "times_confirmed": 1,
+            "updated_at": now,
+        }
+        for key in sorted(merchant_keys)
+    ])
+
+
+async def _remember_merchant_keys(
+    session: AsyncSession,
+    household_id: UUID,
+    merchant_keys: set[str],
+    category_id: UUID,
+):
+    """Select-then-write fallback for databases without ON CONFLICT."""
+    result = await session.execute(
+        select(MerchantCategory)
+        .where(MerchantCategory.household_id == household_id)
+        .where(MerchantCategory.merchant_key.in_(merchant_keys))
+    )
+    now = datetime.utcnow()
+    for mapping in result.scalars().all():
+        merchant_keys.discard(mapping.merchant_key)
+        if mapping.category_id == category_id:
+            mapping.times_confirmed += 1
+        else:
+            mapping.category_id = category_id
+            mapping.times_confirmed = 1
+        mapping.updated_at = now
+    
+    session.add_all([
+        MerchantCategory(household_id=household_id, merchant_key=key, category_id=category_id)
+        for key in merchant_keys
+    ])
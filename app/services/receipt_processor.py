@@ -1,9 +1,34 @@
-import anthropic
+import asyncio
 import base64
 import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
 from app.config import settings
+from app.models.models import Category, Receipt
+from app.services.claude_client import ClaudeUnavailableError, claude_client
+from app.services.extraction_cache import (
+    hash_image, get_cached_extraction, store_extraction, store_category
+)
+from app.services.image_processing import normalize_receipt_image, record_extraction
+from app.services.merchant_matcher import MatcherRegistry
+from app.services.merchant_memory import lookup_merchant_category, normalize_merchant
+from app.services.storage import hash_image_file
 
-client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+logger = logging.getLogger(__name__)
+
+# Which categorization source answered, exposed via /metrics
+categorization_stats = {"learned": 0, "rules": 0, "combined": 0, "cached": 0, "claude": 0}
+
+# Batched categorization totals, exposed via /metrics. calls_avoided counts
+# against one categorize_with_claude call per merchant.
+batch_categorization_stats = {"batches": 0, "merchants": 0, "single_fallbacks": 0, "calls_avoided": 0}
 
 EXTRACTION_PROMPT = """Extract data from this receipt image. Return ONLY valid JSON with this structure:
 {
@@ -21,6 +46,21 @@ EXTRACTION_PROMPT = """Extract data from this receipt image. Return ONLY valid J
 
 If a field is unclear, use null. grand_total is required - estimate from visible totals if needed."""
 
+BATCH_CATEGORIZE_PROMPT = """Assign a spending category to each numbered merchant below.
+Return ONLY valid JSON mapping every number to its answer:
+{{"1": {{"category": "category_slug", "confidence": 0.0-1.0}}, "2": ...}}
+
+Valid category slugs: {slugs}
+
+Merchants:
+{merchants}"""
+
+COMBINED_PROMPT_SUFFIX = """
+
+Also categorize the purchase. Add these two fields to the JSON:
+    "category": one of these slugs: {slugs}
+    "category_confidence": number from 0.0 to 1.0"""
+
 # Rule-based categorization for known merchants -> category slugs
 MERCHANT_RULES: dict[str, tuple[str, float]] = {
     "starbucks": ("coffee", 0.95),
@@ -44,12 +84,37 @@ MERCHANT_RULES: dict[str, tuple[str, float]] = {
     "amazon": ("shopping", 0.75),
 }
 
+# Compiled matchers over MERCHANT_RULES plus user-defined MerchantRule rows
+matchers = MatcherRegistry(MERCHANT_RULES)
+
 
-async def extract_receipt_data(image_bytes: bytes, media_type: str) -> dict:
-    """Call Claude vision API to extract receipt data."""
+def parse_json_response(response) -> dict:
+    """Parse the JSON body of a Claude response, tolerating code fences."""
+    raw_text = response.content[0].text
+    if raw_text.startswith("```"):
+        raw_text = raw_text.split("```")[1]
+        if raw_text.startswith("json"):
+            raw_text = raw_text[4:]
+    
+    return json.loads(raw_text.strip())
+
+
+async def extract_receipt_data(
+    image_bytes: bytes,
+    media_type: str,
+    category_slugs: list[str] | None = None,
+) -> dict:
+    """Call Claude vision API to extract receipt data.
+    
+    When category_slugs is given the same call also returns "category" and
+    "category_confidence", so no separate categorization request is needed.
+    """
     b64_image = base64.standard_b64encode(image_bytes).decode("utf-8")
+    prompt = EXTRACTION_PROMPT
+    if category_slugs:
+        prompt += COMBINED_PROMPT_SUFFIX.format(slugs=", ".join(category_slugs))
     
-    response = client.messages.create(
+    response = await claude_client.create_message(
         model=settings.claude_model,
         max_tokens=1024,
         messages=[
@@ -64,31 +129,23 @@ async def extract_receipt_data(image_bytes: bytes, media_type: str) -> dict:
                             "data": b64_image,
                         },
                     },
-                    {"type": "text", "text": EXTRACTION_PROMPT}
+                    {"type": "text", "text": prompt}
                 ],
             }
         ],
     )
     
-    raw_text = response.content[0].text
-    if raw_text.startswith("```"):
-        raw_text = raw_text.split("```")[1]
-        if raw_text.startswith("json"):
-            raw_text = raw_text[4:]
-    
-    return json.loads(raw_text.strip())
+    return parse_json_response(response)
 
 
 def categorize_by_rules(merchant_name: str | None) -> tuple[str, float] | None:
     """Try to categorize using merchant name rules. Returns (slug, confidence)."""
-    if not merchant_name:
+    match = matchers.default.match(merchant_name)
+    if match is None:
         return None
     
-    merchant_lower = merchant_name.lower()
-    for pattern, (slug, confidence) in MERCHANT_RULES.items():
-        if pattern in merchant_lower:
-            return (slug, confidence)
-    return None
+    _, slug, confidence = match
+    return (slug, confidence)
 
 
 async def categorize_with_claude(
@@ -107,39 +164,208 @@ Valid category slugs: {", ".join(available_slugs)}
 Merchant: {merchant_name or "Unknown"}
 Items: {items_str or "Unknown"}"""
     
-    response = client.messages.create(
+    response = await claude_client.create_message(
         model=settings.claude_model,
         max_tokens=100,
         messages=[{"role": "user", "content": prompt}],
     )
     
-    raw_text = response.content[0].text
-    if raw_text.startswith("```"):
-        raw_text = raw_text.split("```")[1]
-        if raw_text.startswith("json"):
-            raw_text = raw_text[4:]
-    
-    result = json.loads(raw_text.strip())
+    result = parse_json_response(response)
     return (result["category"], float(result["confidence"]))
 
 
+@dataclass
+class BatchCategorization:
+    answers: dict[str, tuple[str, float] | None]  # Merchant name -> (slug, confidence)
+    calls: int  # Claude requests made, batches plus single-call fallbacks
+    calls_avoided: int  # Versus one categorize_with_claude call per merchant
+
+
+def _batch_answer(parsed, number: int, available_slugs: list[str]) -> tuple[str, float] | None:
+    answer = parsed.get(str(number)) if isinstance(parsed, dict) else None
+    if not isinstance(answer, dict) or answer.get("category") not in available_slugs:
+        return None
+    try:
+        return (answer["category"], float(answer["confidence"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def _categorize_batch(
+    batch: list[tuple[str, list]],
+    available_slugs: list[str],
+) -> tuple[list[tuple[str, float] | None], int]:
+    """One prompt for up to claude_categorize_batch_size merchants.
+    
+    Returns an answer per merchant and the number of single-call fallbacks
+    made for entries the batch answer left out or garbled.
+    """
+    lines = []
+    for number, (name, line_items) in enumerate(batch, start=1):
+        items_str = ", ".join(item.get("description", "") for item in line_items[:3])
+        lines.append(f"{number}. {name}" + (f" (items: {items_str})" if items_str else ""))
+    prompt = BATCH_CATEGORIZE_PROMPT.format(
+        slugs=", ".join(available_slugs), merchants="\n".join(lines)
+    )
+    
+    try:
+        response = await claude_client.create_message(
+            model=settings.claude_model,
+            max_tokens=50 + 30 * len(batch),
+            messages=[{"role": "user", "content": prompt}],
+        )
+        parsed = parse_json_response(response)
+    except ClaudeUnavailableError as e:
+        # Single calls would only fail the same way
+        logger.warning("Batched categorization of %d merchants skipped: %s", len(batch), e)
+        return [None] * len(batch), 0
+    except Exception:
+        logger.exception("Batched categorization of %d merchants failed", len(batch))
+        parsed = None
+    
+    answers = [
+        _batch_answer(parsed, number, available_slugs)
+        for number in range(1, len(batch) + 1)
+    ]
+    
+    async def single(name: str, line_items: list) -> tuple[str, float] | None:
+        try:
+            return await categorize_with_claude(name, line_items, available_slugs)
+        except Exception:
+            logger.exception("Claude categorization failed for %r", name)
+            return None
+    
+    missing = [i for i, answer in enumerate(answers) if answer is None]
+    retried = await asyncio.gather(*(single(*batch[i]) for i in missing))
+    for i, answer in zip(missing, retried):
+        answers[i] = answer
+    return answers, len(missing)
+
+
+async def categorize_merchants_with_claude(
+    merchants: list[tuple[str, list]],
+    available_slugs: list[str],
+) -> BatchCategorization:
+    """Categorize many (merchant name, line items) pairs in as few Claude calls as possible.
+    
+    Merchants are deduplicated ("STARBUCKS #12" and "Starbucks #40" are
+    asked about once) and sent claude_categorize_batch_size to a prompt, the
+    batches running concurrently. Entries a batch answer leaves out or
+    garbles fall back to categorize_with_claude; answers are None only when
+    that fails too.
+    """
+    by_key: dict[str, tuple[str, list]] = {}
+    for name, line_items in merchants:
+        by_key.setdefault(normalize_merchant(name) or name, (name, line_items))
+    unique = list(by_key.values())
+    size = max(1, settings.claude_categorize_batch_size)
+    batches = [unique[i:i + size] for i in range(0, len(unique), size)]
+    
+    results = await asyncio.gather(*(_categorize_batch(b, available_slugs) for b in batches))
+    
+    key_answers = {}
+    fallbacks = 0
+    for batch, (answers, batch_fallbacks) in zip(batches, results):
+        for (name, _), answer in zip(batch, answers):
+            key_answers[normalize_merchant(name) or name] = answer
+        fallbacks += batch_fallbacks
+        logger.info(
+            "Categorized %d merchants in one call: %d single-call fallbacks, %d calls avoided",
+            len(batch), batch_fallbacks, len(batch) - 1 - batch_fallbacks,
+        )
+    
+    calls = len(batches) + fallbacks
+    calls_avoided = len(merchants) - calls
+    batch_categorization_stats["batches"] += len(batches)
+    batch_categorization_stats["merchants"] += len(merchants)
+    batch_categorization_stats["single_fallbacks"] += fallbacks
+    batch_categorization_stats["calls_avoided"] += calls_avoided
+    
+    return BatchCategorization(
+        answers={name: key_answers[normalize_merchant(name) or name] for name, _ in merchants},
+        calls=calls,
+        calls_avoided=calls_avoided,
+    )
+
+
+def combined_answer_usable(extracted: dict, slug_to_id: dict) -> bool:
+    """True if a combined-mode extraction carries a confident, valid category."""
+    if extracted.get("category") not in slug_to_id:
+        return False
+    try:
+        confidence = float(extracted.get("category_confidence"))
+    except (TypeError, ValueError):
+        return False
+    return confidence >= settings.category_confidence_threshold
+
+
 async def process_receipt(
-    image_bytes: bytes, 
+    image: bytes | Path, 
     media_type: str,
-    available_categories: list[dict]
+    available_categories: list[dict],
+    image_hash: str | None = None,
+    household_id: UUID | None = None,
+    claude_fallback: bool = True,
 ) -> dict:
-    """Full receipt processing pipeline: extract + categorize."""
-    extracted = await extract_receipt_data(image_bytes, media_type)
+    """Full receipt processing pipeline: extract + categorize.
+    
+    image is either the upload bytes or the path of the stored file; pass
+    image_hash when it is already known to avoid hashing again.
+    
+    With claude_fallback=False a receipt nothing cheaper could categorize
+    comes back with category_slug None (category "other", confidence 0), so
+    the caller can batch several through categorize_pending.
+    """
+    # Re-uploads of the same image reuse the stored extraction
+    if image_hash is None:
+        image_hash = await hash_image_file(image) if isinstance(image, Path) else hash_image(image)
     
     # Build slug -> id mapping
     slug_to_id = {cat["slug"]: cat["id"] for cat in available_categories}
     available_slugs = list(slug_to_id.keys())
+    id_to_slug = {cat["id"]: cat["slug"] for cat in available_categories}
     
-    # Try rule-based categorization first
-    rule_result = categorize_by_rules(extracted.get("merchant_name"))
+    cached = await get_cached_extraction(image_hash)
+    image_stats = None
+    if cached is not None:
+        extracted = cached.extraction
+    else:
+        send_bytes, send_type, image_stats = await normalize_receipt_image(image, media_type)
+        combined = settings.extraction_mode == "combined"
+        start = time.perf_counter()
+        extracted = await extract_receipt_data(
+            send_bytes, send_type, available_slugs if combined else None
+        )
+        image_stats["extract_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        record_extraction(image_stats["extract_ms"])
+        await store_extraction(image_hash, extracted)
+    
+    # Categories the household chose for this merchant before win outright
+    learned_id = None
+    if household_id:
+        learned_id = await lookup_merchant_category(household_id, extracted.get("merchant_name"))
+    
+    # Then rule-based categorization, including the household's own rules
+    matcher = await matchers.for_household(household_id)
+    rule_match = matcher.match(extracted.get("merchant_name"))
+    rule_result = rule_match[1:] if rule_match else None
     
-    if rule_result and rule_result[0] in slug_to_id:
+    if learned_id in id_to_slug:
+        slug, confidence = id_to_slug[learned_id], 1.0
+        categorization_stats["learned"] += 1
+    elif rule_result and rule_result[0] in slug_to_id:
         slug, confidence = rule_result
+        categorization_stats["rules"] += 1
+    elif combined_answer_usable(extracted, slug_to_id):
+        # Answered by the combined extraction call
+        slug, confidence = extracted["category"], float(extracted["category_confidence"])
+        categorization_stats["combined"] += 1
+    elif cached is not None and cached.category_slug in slug_to_id:
+        # Same image was categorized by Claude before
+        slug, confidence = cached.category_slug, cached.category_confidence
+        categorization_stats["cached"] += 1
+    elif not claude_fallback:
+        slug, confidence = None, 0.0
     else:
         # Fall back to Claude
         slug, confidence = await categorize_with_claude(
@@ -147,6 +373,8 @@ async def process_receipt(
             extracted.get("line_items", []),
             available_slugs
         )
+        categorization_stats["claude"] += 1
+        await store_category(image_hash, slug, confidence)
     
     category_id = slug_to_id.get(slug) or slug_to_id.get("other")
     
@@ -163,4 +391,91 @@ async def process_receipt(
         "category_slug": slug,
         "category_confidence": confidence,
         "raw_extraction": extracted,
-    }
\ No newline at end of file
+        "image_hash": image_hash,
+        "extraction_cached": cached is not None,
+        "image_stats": image_stats,
+    }
+
+
+async def categorize_pending(results: list[dict], available_categories: list[dict]):
+    """Categorize the process_receipt(..., claude_fallback=False) results left pending.
+    
+    Merchants are asked about in batches; receipts without a merchant name
+    get a call each, as their line items are all there is to go on. Results
+    are updated in place; ones Claude couldn't answer stay pending.
+    """
+    pending = [r for r in results if r["category_slug"] is None]
+    if not pending:
+        return
+    slug_to_id = {cat["slug"]: cat["id"] for cat in available_categories}
+    available_slugs = list(slug_to_id)
+    
+    named = [r for r in pending if r["merchant_name"]]
+    batch = await categorize_merchants_with_claude(
+        [(r["merchant_name"], r["line_items"]) for r in named], available_slugs
+    )
+    answers = [batch.answers[r["merchant_name"]] for r in named]
+    
+    async def single(result: dict) -> tuple[str, float] | None:
+        try:
+            return await categorize_with_claude(None, result["line_items"], available_slugs)
+        except Exception:
+            logger.exception("Claude categorization failed for %s", result["image_hash"])
+            return None
+    
+    unnamed = [r for r in pending if not r["merchant_name"]]
+    answers += await asyncio.gather(*(single(r) for r in unnamed))
+    
+    for result, answer in zip(named + unnamed, answers):
+        if answer is None:
+            continue
+        slug, confidence = answer
+        result["category_id"] = slug_to_id.get(slug) or slug_to_id.get("other")
+        result["category_slug"] = slug
+        result["category_confidence"] = confidence
+        categorization_stats["claude"] += 1
+        await store_category(result["image_hash"], slug, confidence)
+
+
+async def load_category_options(session: AsyncSession, household_id: UUID) -> list[dict]:
+    """Active categories in the shape process_receipt expects."""
+    cat_query = select(Category).where(
+        Category.household_id == household_id,
+        Category.is_active == True
+    )
+    cat_result = await session.execute(cat_query)
+    return [
+        {"id": c.id, "slug": c.slug, "name": c.name} 
+        for c in cat_result.scalars().all()
+    ]
+
+
+def build_receipt(
+    result: dict,
+    image_path: str,
+    user_id: UUID,
+    household_id: UUID | None,
+) -> Receipt:
+    """Turn a process_receipt result into an unsaved Receipt."""
+    tx_date = None
+    if result.get("transaction_date"):
+        try:
+            tx_date = datetime.fromisoformat(result["transaction_date"])
+        except ValueError:
+            pass
+    
+    return Receipt(
+        user_id=user_id,
+        household_id=household_id,
+        image_path=image_path,
+        merchant_name=result.get("merchant_name"),
+        transaction_date=tx_date,
+        subtotal=Decimal(str(result["subtotal"])) if result.get("subtotal") else None,
+        tax=Decimal(str(result["tax"])) if result.get("tax") else None,
+        tip=Decimal(str(result["tip"])) if result.get("tip") else None,
+        grand_total=Decimal(str(result["grand_total"])),
+        payment_method=result.get("payment_method"),
+        category_id=result.get("category_id"),
+        category_confidence=result["category_confidence"],
+        raw_extraction=result["raw_extraction"],
+    )
@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+from sqlalchemy import and_, column, exists, func, insert, literal, literal_column, null, or_, table
+from sqlmodel import select
+
+from app.config import settings
+from app.models.models import Receipt, Category, LineItem
+from app.schemas.schemas import ReceiptListItem, CategoryResponse
+
+
+def receipt_list_query(active_categories_only: bool = False):
+    """Select just the columns ReceiptListItem needs, category joined in.
+    
+    Skips raw_extraction and the other detail columns, and avoids building
+    ORM objects. Add filters and ordering on Receipt as usual.
+    """
+    join_on = Category.id == Receipt.category_id
+    if active_categories_only:
+        join_on = and_(join_on, Category.is_active == True)
+    
+    return (
+        select(
+            Receipt.id,
+            Receipt.merchant_name,
+            Receipt.transaction_date,
+            Receipt.grand_total,
+            Receipt.expense_type,
+            Receipt.category_confidence,
+            Receipt.created_at,
+            Receipt.effective_date,
+            Category.id.label("category_id"),
+            Category.name.label("category_name"),
+            Category.slug.label("category_slug"),
+            Category.icon.label("category_icon"),
+            Category.is_active.label("category_is_active"),
+            Category.sort_order.label("category_sort_order"),
+        )
+        .select_from(Receipt)
+        .outerjoin(Category, join_on)
+    )
+
+
+def row_to_list_item(row) -> ReceiptListItem:
+    """Build a ReceiptListItem from a receipt_list_query() row."""
+    category = None
+    if row.category_id is not None:
+        category = CategoryResponse.model_construct(
+            id=row.category_id,
+            name=row.category_name,
+            slug=row.category_slug,
+            icon=row.category_icon,
+            is_active=row.category_is_active,
+            sort_order=row.category_sort_order,
+        )
+    return ReceiptListItem.model_construct(
+        id=row.id,
+        merchant_name=row.merchant_name,
+        transaction_date=row.transaction_date,
+        grand_total=row.grand_total,
+        category=category,
+        expense_type=row.expense_type,
+        needs_review=row.category_confidence < settings.category_confidence_threshold,
+        created_at=row.created_at,
+    )
+
+
+EXPORT_FIELDS = [
+    "id", "date", "merchant_name", "category", "grand_total", "subtotal", "tax",
+    "tip", "payment_method", "expense_type", "category_confidence", "created_at",
+]
+
+
+def receipt_export_query():
+    """Flat EXPORT_FIELDS columns for exports, category name joined in."""
+    return (
+        select(
+            Receipt.id,
+            Receipt.effective_date.label("date"),
+            Receipt.merchant_name,
+            Category.name.label("category"),
+            Receipt.grand_total,
+            Receipt.subtotal,
+            Receipt.tax,
+            Receipt.tip,
+            Receipt.payment_method,
+            Receipt.expense_type,
+            Receipt.category_confidence,
+            Receipt.created_at,
+        )
+        .select_from(Receipt)
+        .outerjoin(Category, Category.id == Receipt.category_id)
+    )
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def export_csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_FIELDS)
+    return buffer.getvalue()
+
+
+def export_csv_rows(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [_export_value(value) for value in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+def export_ndjson_rows(rows) -> str:
+    return "".join(
+        json.dumps({field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}) + "\n"
+        for row in rows
+    )
+
+
+# Created by database._create_search_index; SQLite only
+receipt_fts = table(
+    "receipt_fts",
+    column("rowid"), column("merchant_name"), column("payment_method"), column("items"),
+)
+
+
+def receipt_fts_insert(*filters):
+    """INSERT indexing the receipts matching filters, for writes the triggers skip."""
+    return insert(receipt_fts).from_select(
+        ["rowid", "merchant_name", "payment_method", "items"],
+        select(
+            literal_column("receipt.rowid"),
+            Receipt.merchant_name,
+            Receipt.payment_method,
+            literal(""),
+        ).where(*filters),
+    )
+
+
+_SEARCH_TERM = re.compile(r"\w+")
+
+
+def search_terms(q: str) -> list[str]:
+    """Words of a search box query; punctuation and FTS syntax are dropped."""
+    return _SEARCH_TERM.findall(q.lower())
+
+
+def _fts_terms(terms: list[str]) -> list[str]:
+    # Only the last term, the one still being typed, matches as a prefix:
+    # FTS5 merges the doclists of every token a prefix covers, which is slow
+    # for common words. Single characters are never prefixes.
+    *words, last = terms
+    last = f'"{last}"*' if len(last) > 1 else f'"{last}"'
+    return [f'"{word}"' for word in words] + [last]
+
+
+def fts_match_query(terms: list[str]) -> str:
+    """FTS5 query requiring every term: ["starbucks", "cof"] -> "starbucks" "cof"*"""
+    return " ".join(_fts_terms(terms))
+
+
+def _fts_match(query: str):
+    return literal_column("receipt_fts").op("MATCH")(query)
+
+
+def search_term_counts_query(terms: list[str], cap: int):
+    """One row with the number of receipt_fts matches for each term, counted no further than cap."""
+    return select(*(
+        select(func.count())
+        .select_from(
+            select(receipt_fts.c.rowid).where(_fts_match(term)).limit(cap).subquery()
+        )
+        .scalar_subquery()
+        for term in _fts_terms(terms)
+    ))
+
+
+def receipt_search_query(terms: list[str], dialect_name: str, ranked: bool = True):
+    """receipt_list_query() narrowed to receipts matching every term, plus a snippet column.
+    
+    On SQLite this goes through the receipt_fts index, best match first (or
+    most recently added first when not ranked), with the matched words
+    wrapped in <mark> tags. Other databases fall back to ILIKE, newest first,
+    without a snippet.
+    """
+    query = receipt_list_query()
+    if dialect_name == "sqlite":
+        snippet = func.snippet(literal_column("receipt_fts"), -1, "<mark>", "</mark>", "…", 12)
+        query = (
+            query.add_columns(snippet.label("snippet"))
+            .join(receipt_fts, receipt_fts.c.rowid == literal_column("receipt.rowid"))
+            .where(_fts_match(fts_match_query(terms)))
+        )
+        if not ranked:
+            # Walks the index backwards and stops at the limit
+            return query.order_by(receipt_fts.c.rowid.desc())
+        # Column weights: a merchant match outranks a payment method or line item match
+        return query.order_by(func.bm25(literal_column("receipt_fts"), 10.0, 2.0, 1.0))
+    
+    for term in terms:
+        query = query.where(or_(
+            Receipt.merchant_name.icontains(term, autoescape=True),
+            Receipt.payment_method.icontains(term, autoescape=True),
+            exists().where(
+                LineItem.receipt_id == Receipt.id,
+                LineItem.normalized_description.contains(term, autoescape=True),
+            ),
+        ))
+    return query.add_columns(null().label("snippet")).order_by(
+        Receipt.effective_date.desc(), Receipt.id.desc()
+    )
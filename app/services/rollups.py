@@ -0,0 +1,228 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+from sqlalchemy import delete, func, insert, literal_column, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models.models import (
+    Receipt, MonthlyCategoryRollup, DailyCategoryRollup, receipt_effective_date
+)
+from app.services.dashboard_cache import mark_dashboards_stale
+
+# (household_id, user_id, day, category_id, grand_total); day is "YYYY-MM-DD"
+RollupEntry = tuple[UUID, UUID, str, UUID, Decimal]
+
+# Rollup table -> (period column, Postgres format, SQLite format, period from day)
+ROLLUP_TABLES = {
+    MonthlyCategoryRollup: ("year_month", "YYYY-MM", "%Y-%m", lambda day: day[:7]),
+    DailyCategoryRollup: ("day", "YYYY-MM-DD", "%Y-%m-%d", lambda day: day),
+}
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def day_key(dt: datetime) -> str:
+    return f"{dt.year}-{dt.month:02d}-{dt.day:02d}"
+
+
+def _period_sql(column, dialect_name: str, pg_format: str, sqlite_format: str):
+    if dialect_name == "postgresql":
+        # Inlined, not bound: Postgres only matches the GROUP BY expression
+        # to the select list when both are textually identical
+        return func.to_char(column, literal_column(f"'{pg_format}'"))
+    return func.strftime(sqlite_format, column)
+
+
+def day_sql(column, dialect_name: str):
+    """SQL expression bucketing a datetime column into "YYYY-MM-DD"."""
+    return _period_sql(column, dialect_name, "YYYY-MM-DD", "%Y-%m-%d")
+
+
+def rollup_entry(receipt: Receipt) -> RollupEntry | None:
+    """What a receipt contributes to the rollups; None if it isn't counted."""
+    if receipt.category_id is None or receipt.household_id is None:
+        return None
+    return (
+        receipt.household_id,
+        receipt.user_id,
+        day_key(receipt_effective_date(receipt)),
+        receipt.category_id,
+        Decimal(str(receipt.grand_total)),
+    )
+
+
+async def apply_rollup(
+    session: AsyncSession,
+    entry: RollupEntry | None,
+    sign: int = 1,
+    count: int = 1,
+):
+    """Add (sign=1) or remove (sign=-1) a receipt's contribution. Caller commits.
+    
+    count > 1 applies several receipts at once; entry then carries their sum.
+    """
+    if entry is None:
+        return
+    household_id, user_id, day, category_id, amount = entry
+    await apply_rollups(
+        session, [((household_id, user_id, day, category_id, sign * amount), sign * count)]
+    )
+
+
+async def _increment_rollup(session: AsyncSession, entry: RollupEntry, count: int):
+    """UPDATE, then INSERT if the row is missing; for dialects without an upsert."""
+    household_id, user_id, day, category_id, amount = entry
+    
+    for model, (period_column, _, _, period_of) in ROLLUP_TABLES.items():
+        period = period_of(day)
+        result = await session.execute(
+            update(model)
+            .where(model.household_id == household_id)
+            .where(model.user_id == user_id)
+            .where(getattr(model, period_column) == period)
+            .where(model.category_id == category_id)
+            .values(
+                total=model.total + amount,
+                receipt_count=model.receipt_count + count,
+            )
+        )
+        if result.rowcount == 0:
+            await session.execute(insert(model).values(
+                household_id=household_id,
+                user_id=user_id,
+                category_id=category_id,
+                total=amount,
+                receipt_count=count,
+                **{period_column: period},
+            ))
+
+
+async def apply_rollups(session: AsyncSession, entries: list[tuple[RollupEntry, int]]):
+    """Add many (entry, receipt count) pairs at once; negative ones subtract. Caller commits.
+    
+    Deltas are summed per rollup row and written with one executemany upsert
+    per table. The increment happens in the upsert itself, so concurrent
+    writers can't lose each other's updates or race to insert the same row.
+    """
+    dialect_name = session.bind.dialect.name
+    if dialect_name not in ("sqlite", "postgresql"):
+        for entry, count in entries:
+            await _increment_rollup(session, entry, count)
+        return
+    
+    dialect_insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+    for model, (period_column, _, _, period_of) in ROLLUP_TABLES.items():
+        deltas: dict[tuple, list] = {}
+        for (household_id, user_id, day, category_id, amount), count in entries:
+            key = (household_id, user_id, period_of(day), category_id)
+            delta = deltas.setdefault(key, [Decimal("0"), 0])
+            delta[0] += amount
+            delta[1] += count
+        if not deltas:
+            continue
+        
+        stmt = dialect_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["household_id", "user_id", period_column, "category_id"],
+            set_={
+                "total": model.total + stmt.excluded.total,
+                "receipt_count": model.receipt_count + stmt.excluded.receipt_count,
+            },
+        )
+        # Sorted, so concurrent writers lock rollup rows in the same order
+        await session.execute(stmt, [
+            {
+                "household_id": household_id,
+                "user_id": user_id,
+                period_column: period,
+                "category_id": category_id,
+                "total": total,
+                "receipt_count": count,
+            }
+            for (household_id, user_id, period, category_id), (total, count) in sorted(deltas.items())
+        ])
+
+
+async def apply_rollup_change(
+    session: AsyncSession,
+    before: RollupEntry | None,
+    after: RollupEntry | None,
+):
+    """Move a receipt's contribution after an edit. Caller commits."""
+    if before == after:
+        return
+    await apply_rollup(session, before, -1)
+    await apply_rollup(session, after, 1)
+
+
+def _expected_rollups_query(model, dialect_name: str):
+    period_column, pg_format, sqlite_format, _ = ROLLUP_TABLES[model]
+    period = _period_sql(Receipt.effective_date, dialect_name, pg_format, sqlite_format)
+    return (
+        select(
+            Receipt.household_id,
+            Receipt.user_id,
+            period.label(period_column),
+            Receipt.category_id,
+            func.sum(Receipt.grand_total).label("total"),
+            func.count().label("receipt_count"),
+        )
+        .where(Receipt.household_id != None)
+        .where(Receipt.category_id != None)
+        .group_by(Receipt.household_id, Receipt.user_id, period, Receipt.category_id)
+    )
+
+
+async def rebuild_rollups(session: AsyncSession) -> int:
+    """Recompute every rollup row (monthly and daily) from receipts. Caller commits."""
+    dialect_name = session.bind.dialect.name
+    rows = 0
+    for model, (period_column, _, _, _) in ROLLUP_TABLES.items():
+        await session.execute(delete(model))
+        result = await session.execute(
+            insert(model).from_select(
+                ["household_id", "user_id", period_column, "category_id", "total", "receipt_count"],
+                _expected_rollups_query(model, dialect_name),
+            )
+        )
+        rows += result.rowcount
+    await mark_dashboards_stale(session)
+    return rows
+
+
+async def verify_rollups(session: AsyncSession) -> list[dict]:
+    """Compare stored rollups with the receipts table; returns mismatches."""
+    dialect_name = session.bind.dialect.name
+    mismatches = []
+    for model, (period_column, _, _, _) in ROLLUP_TABLES.items():
+        expected = {
+            (row.household_id, row.user_id, row[2], row.category_id):
+                (_money(row.total), row.receipt_count)
+            for row in (await session.execute(_expected_rollups_query(model, dialect_name))).all()
+        }
+        stored = {
+            (r.household_id, r.user_id, getattr(r, period_column), r.category_id):
+                (_money(r.total), r.receipt_count)
+            for r in (await session.execute(select(model))).scalars().all()
+            # Rows emptied by deletes are harmless
+            if r.receipt_count != 0 or r.total != 0
+        }
+        
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                household_id, user_id, period, category_id = key
+                mismatches.append({
+                    "table": model.__tablename__,
+                    "household_id": household_id,
+                    "user_id": user_id,
+                    "period": period,
+                    "category_id": category_id,
+                    "expected": expected.get(key),
+                    "stored": stored.get(key),
+                })
+    return mismatches
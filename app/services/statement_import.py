@@ -0,0 +1,423 @@
+import asyncio
+import csv
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+from typing import Iterable, Iterator, TextIO
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert
+from sqlmodel import select
+
+from app.config import settings
+from app.database import async_session, async_write_session
+from app.models.models import ExpenseType, Receipt
+from app.services.dashboard_cache import mark_dashboards_stale
+from app.services.merchant_memory import lookup_merchant_categories, normalize_merchant
+from app.services.receipt_processor import (
+    categorize_merchants_with_claude, load_category_options, matchers
+)
+from app.services.receipt_queries import receipt_fts_insert
+from app.services.rollups import apply_rollups, day_key
+
+logger = logging.getLogger(__name__)
+
+DATE_COLUMNS = ("date", "transaction date", "trans. date", "posted date", "posting date", "post date")
+DESCRIPTION_COLUMNS = ("description", "merchant", "payee", "name", "memo", "details")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals")
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d.%m.%Y", "%Y%m%d")
+
+# Rows looked at to decide whether purchases are negative (bank) or positive (card)
+SIGN_SAMPLE_ROWS = 200
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementFormatError(Exception):
+    pass
+
+
+@dataclass
+class StatementTransaction:
+    posted: datetime
+    amount: Decimal  # Positive once parsed: money spent
+    description: str
+    fitid: str | None = None  # OFX transaction id
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    duplicates: int = 0
+    skipped: int = 0  # Credits, payments and unreadable rows
+    claude_calls: int = 0
+    # Imported rows by how they were categorized: learned, rules, claude, uncategorized
+    categorized: Counter = field(default_factory=Counter)
+
+
+def parse_date(value: str | None, formats: list[str] | None = None) -> datetime | None:
+    """Parse with the first matching format. A formats list is reordered so the
+    one that matched is tried first next time (statements stick to one)."""
+    value = (value or "").strip()
+    formats = DATE_FORMATS if formats is None else formats
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if i and isinstance(formats, list):
+            formats.insert(0, formats.pop(i))
+        return parsed
+    return None
+
+
+def parse_amount(value: str | None) -> Decimal | None:
+    """ "$1,234.50", "-12.00" and "(12.00)" style amounts."""
+    value = (value or "").strip().replace("$", "").replace(",", "")
+    negative = value.startswith("(") and value.endswith(")")
+    if negative:
+        value = value[1:-1]
+    try:
+        amount = Decimal(value).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def _pick(columns: dict[str, str], candidates: tuple[str, ...]) -> str | None:
+    return next((columns[name] for name in candidates if name in columns), None)
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[StatementTransaction | None]:
+    """Yield spending rows from a bank or card CSV export; None for skipped rows.
+
+    Columns are found by common header names. A Debit column is taken as-is;
+    with a single signed Amount column, whichever sign most of the first rows
+    have is treated as spending and the other (payments, refunds) is skipped.
+    """
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames:
+        raise StatementFormatError("CSV file is empty")
+
+    columns = {name.strip().lower(): name for name in reader.fieldnames if name}
+    date_col = _pick(columns, DATE_COLUMNS)
+    description_col = _pick(columns, DESCRIPTION_COLUMNS)
+    amount_col = _pick(columns, AMOUNT_COLUMNS) or _pick(columns, DEBIT_COLUMNS)
+    if not (date_col and description_col and amount_col):
+        raise StatementFormatError(
+            f"Unrecognized CSV columns: {', '.join(reader.fieldnames)}"
+        )
+
+    date_formats = list(DATE_FORMATS)
+    
+    def read_row(row: dict) -> StatementTransaction | None:
+        posted = parse_date(row.get(date_col), date_formats)
+        amount = parse_amount(row.get(amount_col))
+        description = (row.get(description_col) or "").strip()
+        if posted is None or not amount or not description:
+            return None
+        return StatementTransaction(posted=posted, amount=amount, description=description)
+
+    rows = (read_row(row) for row in reader)
+    if amount_col.strip().lower() in DEBIT_COLUMNS:
+        spending_sign = 1
+    else:
+        sample = list(islice(rows, SIGN_SAMPLE_ROWS))
+        parsed = [tx for tx in sample if tx is not None]
+        negatives = sum(1 for tx in parsed if tx.amount < 0)
+        spending_sign = -1 if negatives * 2 > len(parsed) else 1
+        rows = chain(sample, rows)
+
+    for tx in rows:
+        if tx is None or tx.amount * spending_sign <= 0:
+            yield None
+            continue
+        tx.amount = abs(tx.amount)
+        yield tx
+
+
+def _ofx_transaction(fields: dict[str, str]) -> StatementTransaction | None:
+    posted = parse_date(fields.get("DTPOSTED", "")[:8])
+    amount = parse_amount(fields.get("TRNAMT"))
+    description = fields.get("NAME") or fields.get("MEMO") or ""
+    # OFX amounts are signed from the account's side: debits are negative
+    if posted is None or amount is None or amount >= 0 or not description:
+        return None
+    return StatementTransaction(
+        posted=posted,
+        amount=-amount,
+        description=description,
+        fitid=fields.get("FITID") or None,
+    )
+
+
+def parse_ofx(chunks: Iterable[str]) -> Iterator[StatementTransaction | None]:
+    """Yield spending rows from an OFX/QFX file (SGML or XML); None for credits.
+
+    The file is scanned tag by tag as it is read, so its size doesn't matter.
+    """
+    buffer = ""
+    current: dict[str, str] | None = None
+
+    def tokens(text: str):
+        for closing, tag, value in _OFX_TAG.findall(text):
+            yield closing, tag.upper(), value.strip()
+
+    def handle(text: str):
+        nonlocal current
+        for closing, tag, value in tokens(text):
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    yield _ofx_transaction(current)
+                current = None if closing else {}
+            elif current is not None and not closing:
+                current[tag] = value
+
+    for chunk in chunks:
+        buffer += chunk
+        # Only tags followed by another "<" are known to be complete
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            continue
+        yield from handle(buffer[:cut])
+        buffer = buffer[cut:]
+    yield from handle(buffer)
+
+
+def read_statement(
+    text: TextIO,
+    filename: str | None = None,
+    format: str | None = None,
+) -> Iterator[StatementTransaction | None]:
+    """Parse a statement file, guessing CSV vs OFX from the name or contents."""
+    if format is None:
+        head = text.read(4096)
+        text.seek(0)
+        is_ofx = (
+            (filename or "").lower().endswith((".ofx", ".qfx"))
+            or "<OFX>" in head.upper()
+            or head.lstrip().startswith("OFXHEADER")
+        )
+        format = "ofx" if is_ofx else "csv"
+
+    if format == "ofx":
+        return parse_ofx(iter(lambda: text.read(64 * 1024), ""))
+    return parse_csv(text)
+
+
+def merchant_key(description: str) -> str:
+    return normalize_merchant(description) or description.strip().lower()
+
+
+def transaction_hash(tx: StatementTransaction, occurrence: int) -> str:
+    """Identity of a statement row across imports of overlapping files.
+
+    occurrence numbers identical rows within one file (two same-priced
+    coffees on one day), so they aren't collapsed into one.
+    """
+    key = f"{tx.posted.date().isoformat()}|{tx.amount}|{tx.description.lower()}|"
+    key += f"ofx:{tx.fitid}" if tx.fitid else str(occurrence)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+async def _categorize_merchants(
+    descriptions: dict[str, str],
+    household_id: UUID,
+    slug_to_id: dict[str, UUID],
+    matcher,
+    use_claude: bool,
+    known: dict[str, tuple[UUID | None, float, str]],
+    result: ImportResult,
+):
+    """Fill known[key] = (category_id, confidence, method) for new merchants.
+
+    descriptions maps each merchant key to the first statement description
+    seen for it. Learned household choices (by key) come first, then the
+    rule engine and Claude, which see the description as printed; rule
+    patterns may contain punctuation the key has dropped ("save-on").
+    """
+    new_keys = [key for key in descriptions if key not in known]
+    if not new_keys:
+        return
+
+    learned = await lookup_merchant_categories(household_id, new_keys)
+    valid_ids = set(slug_to_id.values())
+    unknown = []
+    for key in new_keys:
+        category_id = learned.get(key)
+        match = matcher.match(descriptions[key])
+        if category_id in valid_ids:
+            known[key] = (category_id, 1.0, "learned")
+        elif match and match[1] in slug_to_id:
+            known[key] = (slug_to_id[match[1]], match[2], "rules")
+        else:
+            unknown.append(key)
+
+    answers = {}
+    if use_claude and unknown:
+        batch = await categorize_merchants_with_claude(
+            [(descriptions[key], []) for key in unknown], list(slug_to_id)
+        )
+        answers = batch.answers
+        result.claude_calls += batch.calls
+
+    for key in unknown:
+        answer = answers.get(descriptions[key])
+        if answer and answer[0] in slug_to_id:
+            known[key] = (slug_to_id[answer[0]], answer[1], "claude")
+        else:
+            known[key] = (slug_to_id.get("other"), 0.0, "uncategorized")
+
+
+async def _drop_duplicates(
+    rows: list[tuple[StatementTransaction, str, str]],
+    user_id: UUID,
+    result: ImportResult,
+) -> list[tuple[StatementTransaction, str, str]]:
+    """Rows not imported before and not already entered as a receipt."""
+    async with async_session() as session:
+        existing_hashes = set((await session.execute(
+            select(Receipt.import_hash)
+            .where(Receipt.user_id == user_id)
+            .where(Receipt.import_hash.in_([h for _, _, h in rows]))
+        )).scalars().all())
+        
+        # Purchases entered by hand or scanned: same day, same total
+        first_day = min(tx.posted for tx, _, _ in rows).date()
+        last_day = max(tx.posted for tx, _, _ in rows).date()
+        entered = Counter(
+            (effective_date.date(), Decimal(str(total)).quantize(Decimal("0.01")))
+            for effective_date, total in (await session.execute(
+                select(Receipt.effective_date, Receipt.grand_total)
+                .where(Receipt.user_id == user_id)
+                .where(Receipt.import_hash == None)
+                .where(Receipt.effective_date >= datetime.combine(first_day, time.min))
+                .where(Receipt.effective_date <= datetime.combine(last_day, time.max))
+            )).all()
+        )
+    
+    kept = []
+    for row in rows:
+        tx, _, import_hash = row
+        day_total = (tx.posted.date(), tx.amount)
+        if import_hash in existing_hashes:
+            result.duplicates += 1
+        elif entered[day_total]:
+            entered[day_total] -= 1
+            result.duplicates += 1
+        else:
+            kept.append(row)
+    return kept
+
+
+async def _insert_chunk(
+    rows: list[tuple[StatementTransaction, str, str]],
+    user_id: UUID,
+    household_id: UUID,
+    known: dict[str, tuple[UUID | None, float, str]],
+    result: ImportResult,
+):
+    """Insert one chunk of (transaction, merchant key, hash) rows with their rollups."""
+    now = datetime.utcnow()
+    values = []
+    rollup_totals: dict[tuple[str, UUID], Decimal] = defaultdict(Decimal)
+    rollup_counts: Counter = Counter()
+    for tx, key, import_hash in rows:
+        category_id, confidence, method = known[key]
+        result.categorized[method] += 1
+        values.append({
+            "id": uuid4(),
+            "user_id": user_id,
+            "household_id": household_id,
+            "merchant_name": tx.description,
+            "transaction_date": tx.posted,
+            "grand_total": tx.amount,
+            "category_id": category_id,
+            "category_confidence": confidence,
+            "category_overridden": False,
+            "expense_type": ExpenseType.PERSONAL,
+            "raw_extraction": {"source": "statement", "description": tx.description, "fitid": tx.fitid},
+            "created_at": now,
+            # Bulk inserts skip the mapper events that usually set this
+            "effective_date": tx.posted,
+            "import_hash": import_hash,
+        })
+        if category_id:
+            rollup_key = (day_key(tx.posted), category_id)
+            rollup_totals[rollup_key] += tx.amount
+            rollup_counts[rollup_key] += 1
+    
+    async with async_write_session() as session:
+        # Core insert: the ORM bulk path costs more than the database here
+        await session.execute(insert(Receipt.__table__), values)
+        if session.bind.dialect.name == "sqlite":
+            await session.execute(receipt_fts_insert(
+                Receipt.user_id == user_id,
+                Receipt.import_hash.in_([import_hash for _, _, import_hash in rows]),
+            ))
+        await apply_rollups(session, [
+            ((household_id, user_id, day, category_id, total), rollup_counts[(day, category_id)])
+            for (day, category_id), total in rollup_totals.items()
+        ])
+        await mark_dashboards_stale(session, household_id)
+        await session.commit()
+    result.imported += len(values)
+
+
+async def import_statement(
+    transactions: Iterable[StatementTransaction | None],
+    user_id: UUID,
+    household_id: UUID,
+    use_claude: bool = True,
+) -> ImportResult:
+    """Categorize and insert parsed statement rows, a chunk at a time.
+
+    Each chunk (statement_import_chunk_size rows) is checked for duplicates,
+    categorized and written with one executemany and one commit, so a
+    failed import can simply be re-run.
+    """
+    result = ImportResult()
+    async with async_session() as session:
+        categories = await load_category_options(session, household_id)
+    slug_to_id = {c["slug"]: c["id"] for c in categories}
+    matcher = await matchers.for_household(household_id)
+
+    known: dict[str, tuple[UUID | None, float, str]] = {}
+    keys_by_description: dict[str, str] = {}
+    occurrences: Counter = Counter()
+    transactions = iter(transactions)
+    # Parsing reads the file, so it runs off the event loop, a chunk at a time
+    while chunk := await asyncio.to_thread(
+        lambda: list(islice(transactions, settings.statement_import_chunk_size))
+    ):
+        rows = []
+        for tx in chunk:
+            if tx is None:
+                result.skipped += 1
+                continue
+            identity = (tx.posted.date(), tx.amount, tx.description.lower())
+            occurrences[identity] += 1
+            key = keys_by_description.get(tx.description)
+            if key is None:
+                key = keys_by_description[tx.description] = merchant_key(tx.description)
+            rows.append((tx, key, transaction_hash(tx, occurrences[identity])))
+        rows = await _drop_duplicates(rows, user_id, result) if rows else rows
+        if not rows:
+            continue
+
+        descriptions: dict[str, str] = {}
+        for tx, key, _ in rows:
+            descriptions.setdefault(key, tx.description)
+        await _categorize_merchants(
+            descriptions,
+            household_id, slug_to_id, matcher, use_claude, known, result,
+        )
+        await _insert_chunk(rows, user_id, household_id, known, result)
+
+    return result
@@ -1,26 +1,163 @@
 import aiofiles
+import hashlib
+import json
+import os
+from dataclasses import dataclass
 from pathlib import Path
 from uuid import uuid4
+from fastapi import UploadFile
 from app.config import settings
 
-async def save_receipt_image(image_bytes: bytes, original_filename: str) -> str:
-    """Save receipt image to local storage, return relative path."""
+# Stored uploads are copied and hashed this much at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Allowance per file for multipart boundaries and part headers
+MULTIPART_OVERHEAD = 64 * 1024
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload passes the size limit."""
+
+class RequestTooLargeError(Exception):
+    """A request body without a Content-Length ran past the middleware's limit."""
+
+class RequestSizeLimitMiddleware:
+    """Rejects upload requests whose body is over a per-path limit, before it is parsed.
+    
+    Starlette reads the whole multipart body (spooling it to a temp file)
+    before an endpoint runs, so the endpoint's own size check comes too
+    late to stop an oversized upload being received. This turns a too-large
+    Content-Length away unread and stops reading bodies without one as soon
+    as they pass the limit. Responses match the endpoints' own 400.
+    """
+    
+    def __init__(self, app, limits: dict[str, tuple[int, str]]):
+        # Path -> (max body bytes, error detail)
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        max_bytes, detail = limit
+        
+        headers = dict(scope["headers"])
+        try:
+            content_length = int(headers.get(b"content-length", b""))
+        except ValueError:
+            content_length = None
+        if content_length is not None and content_length > max_bytes:
+            await self._reject(send, detail)
+            return
+        
+        received = 0
+        exceeded = False
+        responded = False
+        
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise RequestTooLargeError
+            return message
+        
+        async def limited_send(message):
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                if exceeded:
+                    # FastAPI reports any error reading the body as a parse error
+                    await self._reject(send, detail)
+                    return
+            if not exceeded:
+                await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except RequestTooLargeError:
+            if responded:
+                raise
+            await self._reject(send, detail)
+    
+    async def _reject(self, send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+@dataclass
+class StoredUpload:
+    relative_path: str
+    size: int
+    sha256: str
+
+def _new_receipt_path(original_filename: str | None) -> str:
     # Generate unique filename preserving extension
-    ext = Path(original_filename).suffix or ".jpg"
-    filename = f"{uuid4()}{ext}"
-    relative_path = f"receipts/{filename}"
-    full_path = settings.upload_dir / relative_path
+    ext = Path(original_filename or "").suffix or ".jpg"
+    return f"receipts/{uuid4()}{ext}"
+
+async def save_receipt_upload(upload: UploadFile, max_bytes: int) -> StoredUpload:
+    """Copy an upload to storage in chunks, hashing as it goes.
     
-    # Ensure directory exists
-    full_path.parent.mkdir(parents=True, exist_ok=True)
+    Data lands in a temp file first and is only moved into place once the
+    whole upload fits under max_bytes; otherwise UploadTooLargeError is
+    raised and nothing is kept. By now Starlette has already received the
+    whole request body; RequestSizeLimitMiddleware is what stops oversized
+    requests from being read.
+    """
+    relative_path = _new_receipt_path(upload.filename)
+    full_path = settings.upload_dir / relative_path
+    tmp_path = settings.upload_dir / "tmp" / f"{uuid4()}.part"
+    tmp_path.parent.mkdir(parents=True, exist_ok=True)
     
-    async with aiofiles.open(full_path, "wb") as f:
-        await f.write(image_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                await f.write(chunk)
+        
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
     
-    return relative_path
+    return StoredUpload(relative_path=relative_path, size=size, sha256=digest.hexdigest())
+
+def receipt_image_path(relative_path: str) -> Path:
+    """Filesystem location of a stored receipt image."""
+    return settings.upload_dir / relative_path
+
+def delete_receipt_upload(relative_path: str):
+    """Remove a stored image that no receipt or job ended up using."""
+    receipt_image_path(relative_path).unlink(missing_ok=True)
+
+async def hash_image_file(path: Path) -> str:
+    """SHA-256 of a stored image, read in chunks."""
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 def get_receipt_url(relative_path: str) -> str:
     """Get URL/path for serving the receipt image."""
     # For local dev, just return the path
     # In production, this could return a proper URL
-    return f"/uploads/{relative_path}"
\ No newline at end of file
+    return f"/uploads/{relative_path}"
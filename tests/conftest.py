@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+from sqlalchemy import func, insert, text
+from sqlmodel import select
+
+# Settings are read when app.config is first imported, so the scratch
+# database and upload dir have to be in the environment before that.
+# TEST_DATABASE_URL runs the suite against another database, e.g. Postgres.
+_scratch = Path(tempfile.mkdtemp(prefix="budget-tracker-tests-"))
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite+aiosqlite:///{_scratch / 'test.db'}"
+)
+os.environ["DATABASE_PROFILE"] = "production"
+os.environ["UPLOAD_DIR"] = str(_scratch / "uploads")
+os.environ["DEBUG"] = "false"
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+
+from app.config import settings
+from app.database import async_write_session, engine, write_engine, init_db
+from app.models.models import Category, ExpenseType, Receipt
+from app.services.rollups import rebuild_rollups
+from app.services.claude_client import CircuitBreaker, TokenBucket, claude_client
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeMessages:
+    """Stands in for client.messages; respond(prompt) returns the reply text.
+
+    The default answers like the real API would for one receipt: an
+    extraction for image prompts and a single category otherwise.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def respond(self, prompt) -> str:
+        if isinstance(prompt, list):
+            return json.dumps({
+                "merchant_name": "Corner Bistro #12",
+                "transaction_date": "2026-10-03",
+                "subtotal": 10,
+                "tax": 1,
+                "tip": None,
+                "grand_total": 11.5,
+                "payment_method": "visa",
+                "line_items": [{"description": "Soup", "quantity": 1, "total_price": 11.5}],
+            })
+        return json.dumps({"category": "dining", "confidence": 0.8})
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0)
+        text = self.respond(kwargs["messages"][0]["content"])
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=None)
+
+
+@pytest.fixture
+def fake_claude(monkeypatch) -> FakeMessages:
+    """Route the shared Claude client to a FakeMessages, with fresh limiter state."""
+    fake = FakeMessages()
+    monkeypatch.setattr(claude_client.client.messages, "create", fake.create)
+    # asyncio primitives belong to the loop they were first used on; each
+    # test runs on its own loop
+    monkeypatch.setattr(claude_client, "semaphore", asyncio.Semaphore(settings.claude_max_concurrency))
+    monkeypatch.setattr(claude_client, "bucket", TokenBucket(0, 1))
+    monkeypatch.setattr(claude_client, "breaker", CircuitBreaker(
+        settings.claude_breaker_threshold, settings.claude_breaker_reset_seconds
+    ))
+    return fake
+
+
+@pytest.fixture
+async def client():
+    """HTTP client for the app on a freshly created schema. Jobs aren't processed."""
+    from app.main import app
+
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+    # Pooled connections are tied to this test's event loop
+    await write_engine.dispose()
+    await engine.dispose()
+
+
+SEED_USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+SEED_HOUSEHOLD_ID = UUID("00000000-0000-0000-0000-000000000002")
+
+
+@pytest.fixture
+def seed_receipts(client):
+    """Top the default user up to count synthetic receipts over the last three years.
+
+    Rows go in with Core executemany (mapper events skipped, so effective_date
+    is set here), then rollups are rebuilt and table statistics refreshed so
+    query plans look like they would on a real database of that size.
+    """
+    async def seed(count: int, chunk_size: int = 5000):
+        rng = random.Random(count)
+        async with async_write_session() as session:
+            existing = (await session.execute(
+                select(func.count()).select_from(Receipt).where(Receipt.user_id == SEED_USER_ID)
+            )).scalar_one()
+            if existing >= count:
+                return
+            category_ids = (await session.execute(
+                select(Category.id).where(Category.household_id == SEED_HOUSEHOLD_ID)
+            )).scalars().all()
+
+            now = datetime.utcnow()
+            for start in range(existing, count, chunk_size):
+                rows = []
+                for i in range(start, min(start + chunk_size, count)):
+                    posted = now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+                    rows.append({
+                        "id": uuid4(),
+                        "user_id": SEED_USER_ID,
+                        "household_id": SEED_HOUSEHOLD_ID,
+                        "merchant_name": f"Seeded Merchant {i % 5000}",
+                        "transaction_date": posted,
+                        "grand_total": Decimal(rng.randrange(100, 20000)) / 100,
+                        "category_id": rng.choice(category_ids),
+                        "category_confidence": 1.0,
+                        "category_overridden": False,
+                        "expense_type": ExpenseType.PERSONAL,
+                        "raw_extraction": {},
+                        "created_at": now,
+                        "effective_date": posted,
+                    })
+                await session.execute(insert(Receipt.__table__), rows)
+            await rebuild_rollups(session)
+            await session.commit()
+            await session.execute(text("ANALYZE"))
+            await session.commit()
+
+    return seed
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import re
+
+import pytest
+
+from app.config import settings
+from app.services.claude_client import ClaudeUnavailableError, claude_client
+from app.services.merchant_memory import normalize_merchant
+from app.services.receipt_processor import categorize_merchants_with_claude, categorize_with_claude
+
+pytestmark = pytest.mark.anyio
+
+SLUGS = ["groceries", "dining", "coffee", "transportation", "shopping", "other"]
+
+# Spellings of the same merchant are asked about once
+NAMES = [f"Merchant {i} #{j}" for i in range(60) for j in range(3)] + ["Joe's Diner", "JOE'S DINER #2"]
+
+
+def _hash(name: str) -> int:
+    return int(hashlib.md5(name.encode()).hexdigest(), 16)
+
+
+def truth(name: str) -> tuple[str, float]:
+    """The category the fake API gives a merchant, whichever way it is asked."""
+    h = _hash(name)
+    return SLUGS[h % len(SLUGS)], round((h % 100) / 100, 2)
+
+
+class ByMerchant:
+    """Answers single and batched categorization prompts from truth().
+
+    With garble set, batch replies leave out some merchants, give others an
+    invalid slug, and come back unparseable for any batch with Joe's Diner.
+    """
+
+    def __init__(self, garble: bool = False):
+        self.garble = garble
+        self.batch_calls = 0
+        self.single_calls = 0
+
+    def __call__(self, prompt: str) -> str:
+        if prompt.startswith("Assign a spending category to each"):
+            self.batch_calls += 1
+            answers = {}
+            for line in prompt.split("Merchants:\n", 1)[1].splitlines():
+                number, name = re.match(r"(\d+)\. (.*?)(?: \(items: .*\))?$", line).groups()
+                if self.garble and name == "Joe's Diner":
+                    return "Sorry, I can't help with that."
+                if self.garble and _hash(name) % 5 == 0:
+                    continue
+                if self.garble and _hash(name) % 7 == 0:
+                    answers[number] = {"category": "not-a-slug", "confidence": "high"}
+                    continue
+                slug, confidence = truth(name)
+                answers[number] = {"category": slug, "confidence": confidence}
+            return "```json\n" + json.dumps(answers) + "\n```"
+
+        self.single_calls += 1
+        slug, confidence = truth(re.search(r"Merchant: (.*)", prompt).group(1))
+        return json.dumps({"category": slug, "confidence": confidence})
+
+
+async def single_call_answers(fake_claude) -> dict[str, tuple[str, float]]:
+    fake_claude.respond = ByMerchant()
+    return {name: await categorize_with_claude(name, [], SLUGS) for name in NAMES}
+
+
+def expected_answers(singles: dict) -> dict:
+    """Each spelling gets the answer for the first spelling of its merchant."""
+    first = {}
+    for name in NAMES:
+        first.setdefault(normalize_merchant(name) or name, name)
+    return {name: singles[first[normalize_merchant(name) or name]] for name in NAMES}
+
+
+@pytest.mark.parametrize("garble", [False, True])
+async def test_batch_answers_match_single_calls(fake_claude, garble):
+    expected = expected_answers(await single_call_answers(fake_claude))
+
+    fake = fake_claude.respond = ByMerchant(garble=garble)
+    result = await categorize_merchants_with_claude([(name, []) for name in NAMES], SLUGS)
+
+    assert result.answers == expected
+    unique = len({normalize_merchant(name) for name in NAMES})
+    assert fake.batch_calls == -(-unique // settings.claude_categorize_batch_size)
+    assert result.calls == fake.batch_calls + fake.single_calls
+    assert result.calls_avoided == len(NAMES) - result.calls
+    if garble:
+        assert 0 < fake.single_calls < unique
+    else:
+        assert fake.single_calls == 0
+
+
+async def test_outage_skips_single_call_fallbacks(fake_claude, monkeypatch):
+    fake = fake_claude.respond = ByMerchant()
+
+    async def unavailable(**kwargs):
+        raise ClaudeUnavailableError("Claude API unavailable")
+
+    monkeypatch.setattr(claude_client, "create_message", unavailable)
+    result = await categorize_merchants_with_claude([(name, []) for name in NAMES], SLUGS)
+
+    assert set(result.answers) == set(NAMES)
+    assert all(answer is None for answer in result.answers.values())
+    assert fake.single_calls == 0
@@ -0,0 +1,40 @@
+import statistics
+import time
+
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.benchmark]
+
+RECEIPTS = 200_000
+PAGE_SIZE = 50
+DEEP_PAGE = 500
+
+
+async def median_latency(client, params: dict, runs: int = 20) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = await client.get("/receipts", params=params)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(timings)
+
+
+async def test_cursor_page_500_costs_the_same_as_page_1(client, seed_receipts):
+    """Page 1 vs. page 500 of GET /receipts on 200k receipts, cursor and offset."""
+    await seed_receipts(RECEIPTS)
+
+    cursor = None
+    for _ in range(DEEP_PAGE - 1):
+        params = {"limit": PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+        cursor = (await client.get("/receipts", params=params)).headers["X-Next-Cursor"]
+
+    first = await median_latency(client, {"limit": PAGE_SIZE})
+    deep = await median_latency(client, {"limit": PAGE_SIZE, "cursor": cursor})
+    deep_offset = await median_latency(client, {"limit": PAGE_SIZE, "offset": (DEEP_PAGE - 1) * PAGE_SIZE})
+
+    print(
+        f"\nGET /receipts, {PAGE_SIZE} per page: page 1 {first * 1000:.1f} ms, "
+        f"page {DEEP_PAGE} by cursor {deep * 1000:.1f} ms, by offset {deep_offset * 1000:.1f} ms"
+    )
+    assert deep < first * 2
@@ -0,0 +1,73 @@
+import random
+import time
+
+import pytest
+
+from app.services.merchant_matcher import MerchantMatcher
+from app.services.receipt_processor import MERCHANT_RULES
+
+pytestmark = pytest.mark.benchmark
+
+RULES = 10_000
+MERCHANTS = 100_000
+SLUGS = ["groceries", "dining", "coffee", "transportation", "shopping", "other"]
+
+
+def synthetic_rules(rng: random.Random) -> dict[str, tuple[str, float]]:
+    rules = dict(MERCHANT_RULES)
+    while len(rules) < RULES:
+        pattern = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(5, 12)))
+        rules[pattern] = (rng.choice(SLUGS), round(rng.uniform(0.5, 0.99), 2))
+    return rules
+
+
+def synthetic_merchants(rng: random.Random, patterns: list[str]) -> list[str]:
+    """Statement-style names; about half contain a rule somewhere."""
+    merchants = []
+    for i in range(MERCHANTS):
+        name = f"POS {rng.randint(1000, 9999)} "
+        if i % 2:
+            name += rng.choice(patterns).upper() + f" #{rng.randint(1, 999)}"
+        else:
+            name += "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ ", k=20))
+        merchants.append(name)
+    return merchants
+
+
+def linear_match(rules: dict[str, tuple[str, float]], text: str):
+    """The old scan, with the matcher's tie-breaks, as the reference."""
+    text = text.lower()
+    found = [(len(p), confidence, p, slug) for p, (slug, confidence) in rules.items() if p in text]
+    if not found:
+        return None
+    _, confidence, pattern, slug = max(found)
+    return pattern, slug, confidence
+
+
+def test_matcher_100k_merchants_10k_rules():
+    rng = random.Random(5)
+    rules = synthetic_rules(rng)
+    merchants = synthetic_merchants(rng, list(rules))
+
+    start = time.perf_counter()
+    matcher = MerchantMatcher(rules)
+    matcher.match("warm up")  # Builds the failure links
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [matcher.match(name) for name in merchants]
+    elapsed = time.perf_counter() - start
+
+    # The linear scan is too slow to run in full; time a sample and scale
+    sample = merchants[:1000]
+    start = time.perf_counter()
+    expected = [linear_match(rules, name) for name in sample]
+    linear = (time.perf_counter() - start) * len(merchants) / len(sample)
+
+    print(
+        f"\n{MERCHANTS} merchants x {len(rules)} rules: build {build * 1000:.0f} ms, "
+        f"match {elapsed:.2f} s ({elapsed / MERCHANTS * 1e6:.1f} us each, "
+        f"{sum(r is not None for r in results)} matched); linear scan ~{linear:.0f} s"
+    )
+    assert results[:len(sample)] == expected
+    assert elapsed * 10 < linear
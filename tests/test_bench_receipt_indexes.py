@@ -0,0 +1,63 @@
+import statistics
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine
+
+pytestmark = [pytest.mark.anyio, pytest.mark.benchmark]
+
+RECEIPTS = 100_000
+INDEX = "ix_receipt_user_id_effective_date"
+
+
+async def explain(conn, statement: str, params) -> list[str]:
+    if conn.dialect.name == "sqlite":
+        rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params)).all()
+        return [row[-1] for row in rows]
+    rows = (await conn.exec_driver_sql("EXPLAIN " + statement, params)).all()
+    return [row[0] for row in rows]
+
+
+async def test_receipt_range_queries_use_effective_date_index(client, seed_receipts):
+    """Month-range receipt queries at 100k receipts: plans and timings.
+
+    The dashboard's recent receipts and the month-filtered list both have to
+    be range scans on (user_id, effective_date), never a table scan.
+    """
+    await seed_receipts(RECEIPTS)
+    now = datetime.utcnow()
+    year, month = (now.year, now.month - 6) if now.month > 6 else (now.year - 1, now.month + 6)
+    params = {"year": year, "month": month}
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM receipt" in statement and statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        assert (await client.get("/budget", params=params)).status_code == 200
+        assert (await client.get("/receipts", params=params)).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    assert statements
+
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = await explain(conn, statement, parameters)
+            timings = []
+            for _ in range(20):
+                start = time.perf_counter()
+                (await conn.exec_driver_sql(statement, parameters)).all()
+                timings.append(time.perf_counter() - start)
+            print(f"\n{' '.join(statement.split())[:100]}...")
+            print(f"  median {statistics.median(timings) * 1000:.2f} ms")
+            for line in plan:
+                print(f"  {line}")
+
+            assert any(INDEX in line for line in plan)
+            assert not any(line.startswith("SCAN receipt") or "Seq Scan on receipt" in line for line in plan)
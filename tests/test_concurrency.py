@@ -0,0 +1,100 @@
+import asyncio
+import io
+from uuid import UUID
+
+import pytest
+from PIL import Image
+from sqlalchemy import func, text
+from sqlmodel import select
+
+from app.database import async_session, async_write_session, engine, is_sqlite, write_engine
+from app.models.models import MerchantCategory, Receipt
+from app.services.merchant_memory import remember_merchant_category
+from app.services.rollups import verify_rollups
+
+pytestmark = pytest.mark.anyio
+
+
+def receipt_image(shade: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (64, 64), (shade, 20, 20)).save(out, "PNG")
+    return out.getvalue()
+
+
+@pytest.mark.skipif(not is_sqlite, reason="SQLite production profile")
+async def test_production_profile_pragmas(client):
+    assert write_engine is not engine
+    async with async_write_session() as session:
+        assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await session.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+    async with async_session() as session:
+        assert (await session.execute(text("PRAGMA busy_timeout"))).scalar() > 0
+
+
+async def test_concurrent_writes_and_reads(client, fake_claude):
+    """Manual entries, uploads, bulk edits and dashboard reads all at once.
+
+    Every request has to succeed ("database is locked" would surface as a
+    500) and the rollups must end up matching the receipts.
+    """
+    async with async_session() as session:
+        start_count = (await session.execute(select(func.count()).select_from(Receipt))).scalar()
+    categories = (await client.get("/categories")).json()
+
+    async def manual(i):
+        return await client.post("/receipts/manual", json={
+            "merchant_name": f"Stress Merchant {i}",
+            "grand_total": "1.25",
+            "category_id": categories[i % len(categories)]["id"],
+            "transaction_date": "2026-10-05T00:00:00",
+        })
+
+    async def upload(i):
+        files = {"file": (f"{i}.png", receipt_image(i), "image/png")}
+        return await client.post("/receipts/upload", files=files)
+
+    async def recategorize(i):
+        return await client.patch("/receipts/bulk", json={
+            "filter": {"merchant_contains": "stress merchant"},
+            "category_id": categories[i % len(categories)]["id"],
+        })
+
+    async def dashboard(i):
+        return await client.get("/budget", params={"year": 2026, "month": 10})
+
+    requests = (
+        [manual(i) for i in range(40)]
+        + [upload(i) for i in range(8)]
+        + [recategorize(i) for i in range(5)]
+        + [dashboard(i) for i in range(40)]
+    )
+    responses = await asyncio.gather(*requests)
+
+    failures = [(r.request.method, r.request.url.path, r.status_code) for r in responses if r.status_code != 200]
+    assert failures == []
+    async with async_session() as session:
+        count = (await session.execute(select(func.count()).select_from(Receipt))).scalar()
+        assert count == start_count + 48
+        assert await verify_rollups(session) == []
+
+
+
+async def test_concurrent_confirmations_of_a_new_merchant(client):
+    """Writers confirming a merchant nobody has seen all land on one mapping."""
+    categories = (await client.get("/categories")).json()
+    household_id = UUID("00000000-0000-0000-0000-000000000002")
+    category_id = UUID(categories[0]["id"])
+
+    async def confirm():
+        async with async_write_session() as session:
+            await remember_merchant_category(session, household_id, "Brand New Bakery #7", category_id)
+            await session.commit()
+
+    await asyncio.gather(*[confirm() for _ in range(10)])
+
+    async with async_session() as session:
+        mapping = (await session.execute(
+            select(MerchantCategory).where(MerchantCategory.merchant_key == "brand new bakery")
+        )).scalar_one()
+        assert mapping.category_id == category_id
+        assert mapping.times_confirmed == 10
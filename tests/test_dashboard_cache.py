@@ -0,0 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from app.database import async_write_session
+from app.models.models import Receipt
+from app.services.rollups import rebuild_rollups
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+HOUSEHOLD_ID = UUID("00000000-0000-0000-0000-000000000002")
+
+
+async def test_dashboard_sees_writes_from_other_processes(client):
+    """A cached dashboard goes stale when the database changes under it.
+
+    The receipt is written and the rollups rebuilt the way the CLI does it,
+    without going through this process's routes.
+    """
+    params = {"year": 2031, "month": 3}
+    first = await client.get("/budget", params=params)
+    etag = first.headers["ETag"]
+    assert (await client.get("/budget", params=params, headers={"If-None-Match": etag})).status_code == 304
+
+    categories = (await client.get("/categories")).json()
+    async with async_write_session() as session:
+        session.add(Receipt(
+            user_id=USER_ID,
+            household_id=HOUSEHOLD_ID,
+            merchant_name="Elsewhere",
+            transaction_date=datetime(2031, 3, 14),
+            grand_total=Decimal("42.00"),
+            category_id=UUID(categories[0]["id"]),
+        ))
+        await rebuild_rollups(session)
+        await session.commit()
+
+    second = await client.get("/budget", params=params, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+    spent = Decimal(second.json()["total_spent"]) - Decimal(first.json()["total_spent"])
+    assert spent == Decimal("42.00")
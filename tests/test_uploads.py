@@ -0,0 +1,47 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def receipt_image(shade: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (64, 64), (20, shade, 20)).save(out, "PNG")
+    return out.getvalue()
+
+
+def stored_images() -> set:
+    return {path.name for path in (settings.upload_dir / "receipts").glob("*")}
+
+
+async def test_batch_upload_matches_single_upload(client, fake_claude):
+    single = (await client.post("/receipts/upload", files={"file": ("one.png", receipt_image(1), "image/png")})).json()
+    before = stored_images()
+
+    # The API can't make anything of the unreadable image
+    broken_image = b"not really a png"
+    default = fake_claude.respond
+
+    def respond(prompt):
+        if isinstance(prompt, list) and base64.b64encode(broken_image).decode() in str(prompt):
+            return "I can't read this receipt."
+        return default(prompt)
+
+    fake_claude.respond = respond
+
+    files = [
+        ("files", ("two.png", receipt_image(2), "image/png")),
+        ("files", ("broken.png", broken_image, "image/png")),
+    ]
+    batch = (await client.post("/receipts/upload/batch", files=files)).json()
+
+    good, broken = batch["results"]
+    assert good["receipt"]["grand_total"] == single["grand_total"] == "11.50"
+    assert broken["receipt"] is None and broken["error"]
+    # Only the image that became a receipt is kept
+    assert len(stored_images() - before) == 1